@@ -1,18 +1,30 @@
 #!/usr/bin/env python
 import argparse
 import sys
+from collections.abc import Callable
 
+from ext_api.config import sync_concurrency
 from ext_api.db import init_db
 from ext_api.helpers.logging_utils import setup_logging
+from ext_api.s3.catalog_export import export_catalog
 from ext_api.server import http_server
-from ext_api.sync_extensions import sync_extensions
+from ext_api.sync_daemon import sync_daemon
+from ext_api.sync_extensions import parse_shard, sync_extensions
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Application commands")
-    tasks = {
-        "http_server": (http_server, "Start the API server"),
-        "init_db": (init_db, "Initialize the database"),
-        "sync_extensions": (sync_extensions, "Sync extensions from Github"),
+    tasks: dict[str, tuple[Callable[[argparse.Namespace], object], str]] = {
+        "http_server": (lambda _: http_server(), "Start the API server"),
+        "init_db": (lambda _: init_db(), "Initialize the database"),
+        "sync_extensions": (
+            lambda args: sync_extensions(concurrency=args.concurrency, full=args.full, shard=args.shard),
+            "Sync extensions from Github",
+        ),
+        "sync_daemon": (
+            lambda args: sync_daemon(concurrency=args.concurrency),
+            "Keep syncing extensions from Github, popular and recently changed ones more often",
+        ),
+        "export_catalog": (lambda _: export_catalog(), "Upload pre-rendered extension list pages to S3"),
     }
     parser.add_argument(
         "cmd",
@@ -21,6 +33,24 @@ if __name__ == "__main__":
         help="Command to run. Available commands: "
         + "\n".join([f"{cmd} - {desc}" for cmd, (_, desc) in tasks.items()]),
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=sync_concurrency,
+        help="sync_extensions, sync_daemon: number of extensions synced in parallel (default: $SYNC_CONCURRENCY or 1)",
+    )
+
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="sync_extensions: re-read versions of all extensions, including ones without new commits",
+    )
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=(0, 1),
+        help="sync_extensions: sync only shard <index>/<count> of extensions, e.g. 0/4 (default: 0/1)",
+    )
 
     # Show help if no arguments are provided
     if len(sys.argv) == 1:
@@ -30,4 +60,4 @@ if __name__ == "__main__":
     args = parser.parse_args()
 
     setup_logging()
-    tasks[args.cmd][0]()
+    tasks[args.cmd][0](args)
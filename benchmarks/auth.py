@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""
+Measures throughput of bottle_auth_plugin for a route that requires auth, with and without the verified token cache
+
+Usage: python benchmarks/auth.py [number of requests]
+"""
+
+import sys
+import time
+from typing import Any
+
+import jwt
+from bottle import request
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from ext_api.helpers import auth
+from ext_api.helpers.auth import AUTH0_CLIENT_ID, bottle_auth_plugin, jwt_auth_required
+from ext_api.helpers.cache import LRUCache
+
+ROUNDS = 5
+
+
+def main() -> None:
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    auth.signing_keys.keys = {"bench": private_key.public_key()}
+    auth.signing_keys.refreshed_at = time.time()
+    # the website sends the same token with every request of a session
+    token = jwt.encode(
+        {"sub": "github|1", "aud": AUTH0_CLIENT_ID, "exp": int(time.time()) + 3600},
+        private_key,
+        algorithm="RS256",
+        headers={"kid": "bench"},
+    )
+    environ = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+    route = bottle_auth_plugin(jwt_auth_required(lambda: request.get("REMOTE_USER")))
+
+    def handle_requests() -> None:
+        for _ in range(size):
+            request.bind(environ.copy())  # type: ignore
+            assert route() == "github|1"
+
+    caches: dict[str, LRUCache[bytes, dict[str, Any]]] = {
+        "no token cache": LRUCache(maxsize=0, ttl=0),
+        "verified token cache": LRUCache(maxsize=1024, ttl=3600),
+    }
+    print(f"Handling {size} authenticated requests, best of {ROUNDS} rounds")
+    for name, cache in caches.items():
+        auth.verified_tokens = cache
+        timings: list[float] = []
+        for _ in range(ROUNDS):
+            started_at = time.perf_counter()
+            handle_requests()
+            timings.append(time.perf_counter() - started_at)
+        best = min(timings)
+        print(f"{name:24} {size / best:10.0f} requests/s  {best / size * 1e6:8.1f} us/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""
+Compares bson.json_util.dumps with ext_api.helpers.json_encoder.dumps on a GET /extensions page
+
+Usage: python benchmarks/json_encoder.py [number of extensions]
+"""
+
+import datetime
+import sys
+import timeit
+
+from bson import ObjectId, json_util
+
+from ext_api.helpers.json_encoder import dumps
+
+ROUNDS = 20
+
+
+def make_page(size: int) -> dict[str, object]:
+    created_at = datetime.datetime(2020, 1, 1, tzinfo=datetime.UTC)
+    extensions = [
+        {
+            "_id": ObjectId(),
+            "ID": f"github-developer-ulauncher-extension-{i}",
+            "User": f"github|{1000000 + i}",
+            "GithubUrl": f"https://github.com/developer/ulauncher-extension-{i}",
+            "ProjectPath": f"developer/ulauncher-extension-{i}",
+            "Name": f"Extension {i}",
+            "Description": "Does something useful with the text you type into Ulauncher. " * 2,
+            "DeveloperName": "Developer Name",
+            "Images": [f"https://ext-images.example.com/github|{1000000 + i}/{n}.png" for n in range(3)],
+            "SupportedVersions": ["2", "3"],
+            "GithubStars": i % 500,
+            "Published": True,
+            "CreatedAt": created_at + datetime.timedelta(days=i),
+            "UpdatedAt": created_at + datetime.timedelta(days=i, hours=1),
+        }
+        for i in range(size)
+    ]
+    return {"data": extensions, "offset": 0, "has_more": False, "next_cursor": None}
+
+
+def main() -> None:
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    page = make_page(size)
+    without_id = {**page, "data": [{k: v for k, v in ext.items() if k != "_id"} for ext in page["data"]]}  # type: ignore
+
+    candidates = {
+        "bson.json_util.dumps": lambda: json_util.dumps(page),
+        "bson.json_util.dumps (no _id)": lambda: json_util.dumps(without_id),
+        "json_encoder.dumps (no _id)": lambda: dumps(without_id),
+    }
+    print(f"Encoding a page of {size} extensions, best of {ROUNDS} rounds")
+    for name, fn in candidates.items():
+        best = min(timeit.repeat(fn, number=1, repeat=ROUNDS))
+        print(f"{name:32} {best * 1000:8.2f} ms  {len(fn()):>9} chars")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+import datetime
+
+from ext_api.db import extension_collection, migration_collection
+
+__version__ = 5
+
+
+def run_migration():
+    """
+    Adds ID as a tie-breaker to sort indexes, so keyset pagination (?cursor=) can walk them without skipping
+    """
+    extension_collection.create_index([("Published", 1), ("CreatedAt", -1), ("ID", -1)])
+    extension_collection.create_index([("Published", 1), ("GithubStars", -1), ("ID", -1)])
+    extension_collection.drop_index([("Published", 1), ("CreatedAt", -1)])
+    extension_collection.drop_index([("Published", 1), ("GithubStars", -1)])
+    migration_collection.insert_one({"Version": __version__, "CreatedAt": datetime.datetime.now(datetime.UTC)})
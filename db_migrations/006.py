@@ -0,0 +1,13 @@
+import datetime
+
+from ext_api.db import github_cache_collection, migration_collection
+
+__version__ = 6
+
+
+def run_migration():
+    """
+    Creates GithubCache collection that stores GitHub responses for conditional requests
+    """
+    github_cache_collection.create_index("Url", unique=True)
+    migration_collection.insert_one({"Version": __version__, "CreatedAt": datetime.datetime.now(datetime.UTC)})
@@ -0,0 +1,14 @@
+import datetime
+
+from ext_api.db import migration_collection, sync_state_collection
+
+__version__ = 7
+
+
+def run_migration():
+    """
+    Creates SyncState collection that stores sync_extensions shard leases and checkpoints
+    """
+    sync_state_collection.create_index("Key", unique=True)
+    sync_state_collection.create_index("SyncedAt")
+    migration_collection.insert_one({"Version": __version__, "CreatedAt": datetime.datetime.now(datetime.UTC)})
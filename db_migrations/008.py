@@ -0,0 +1,13 @@
+import datetime
+
+from ext_api.db import extension_collection, migration_collection, project_path_collation
+
+__version__ = 8
+
+
+def run_migration():
+    """
+    Adds case-insensitive index on ProjectPath to find extensions of repositories in GitHub webhooks
+    """
+    extension_collection.create_index("ProjectPath", collation=project_path_collation)
+    migration_collection.insert_one({"Version": __version__, "CreatedAt": datetime.datetime.now(datetime.UTC)})
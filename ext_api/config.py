@@ -45,10 +45,50 @@ if s3_addressing_style:
 
 ext_images_public_base_url = s3_public_base_url or f"https://{ext_images_bucket_name}{s3_https_domain}"
 
+# pre-rendered GET /extensions pages are exported to {catalog_bucket_name}/{catalog_export_prefix}/
+catalog_export_enabled = os.environ.get("CATALOG_EXPORT_ENABLED", "false").lower() == "true"
+catalog_bucket_name = os.getenv("CATALOG_BUCKET_NAME", ext_images_bucket_name)
+catalog_export_prefix = os.getenv("CATALOG_EXPORT_PREFIX", "catalog")
+catalog_export_max_age = int(os.getenv("CATALOG_EXPORT_MAX_AGE", "300"))
+catalog_export_delay = int(os.getenv("CATALOG_EXPORT_DELAY", "10"))
+
 github_api_user = os.getenv("GITHUB_API_USER")
 github_api_token = os.getenv("GITHUB_API_TOKEN")
+# GitHub API requests are spread between GITHUB_API_USER:GITHUB_API_TOKEN and comma-separated GITHUB_API_TOKENS
+# ("<user>:<token>" or just "<token>"), and every token has its own rate limit
+github_api_credentials = [f"{github_api_user}:{github_api_token}"] if github_api_user and github_api_token else []
+github_api_credentials += [
+    token if ":" in token else f"{github_api_user or 'ext-api'}:{token}"
+    for token in (t.strip() for t in os.getenv("GITHUB_API_TOKENS", "").split(","))
+    if token
+]
 github_api_base_url = os.getenv("GITHUB_API_BASE_URL", "https://api.github.com")
 github_raw_base_url = os.getenv("GITHUB_RAW_BASE_URL", "https://raw.githubusercontent.com")
+github_graphql_url = os.getenv("GITHUB_GRAPHQL_URL", f"{github_api_base_url.rstrip('/')}/graphql")
+# GitHub requests are retried with jittered exponential backoff on 5xx responses and secondary rate limits
+github_connect_timeout = float(os.getenv("GITHUB_CONNECT_TIMEOUT", "5"))
+github_read_timeout = float(os.getenv("GITHUB_READ_TIMEOUT", "15"))
+github_max_retries = int(os.getenv("GITHUB_MAX_RETRIES", "3"))
+# requests of every token left for API users. Sync pauses until rate limit reset when every token gets to this number
+github_rate_limit_reserve = int(os.getenv("GITHUB_RATE_LIMIT_RESERVE", "100"))
+sync_concurrency = int(os.getenv("SYNC_CONCURRENCY", "1"))
+# sync_daemon refreshes extensions every SYNC_DAEMON_BASE_INTERVAL / (1 + log2(1 + stars)) seconds
+# (not more often than MIN_INTERVAL). The interval doubles after every sync that didn't change anything,
+# up to MAX_INTERVAL. The daemon uses RATE_BUDGET (fraction) of GitHub API rate limit
+sync_daemon_base_interval = int(os.getenv("SYNC_DAEMON_BASE_INTERVAL", str(24 * 3600)))
+sync_daemon_min_interval = int(os.getenv("SYNC_DAEMON_MIN_INTERVAL", "3600"))
+sync_daemon_max_interval = int(os.getenv("SYNC_DAEMON_MAX_INTERVAL", str(7 * 24 * 3600)))
+sync_daemon_rate_budget = float(os.getenv("SYNC_DAEMON_RATE_BUDGET", "0.5"))
+# new and deleted extensions are picked up this often
+sync_daemon_reload_interval = int(os.getenv("SYNC_DAEMON_RELOAD_INTERVAL", "600"))
+# GitHub push and star webhooks must be signed with this secret. Webhooks are rejected if it's not set
+github_webhook_secret = os.getenv("GITHUB_WEBHOOK_SECRET", "")
+# repeated webhook events of the same repository within this many seconds result in one resync
+github_webhook_delay = float(os.getenv("GITHUB_WEBHOOK_DELAY", "30"))
+# seconds a sync_extensions run holds its shard lease without renewing it (e.g. after a crash)
+sync_lease_ttl = int(os.getenv("SYNC_LEASE_TTL", "300"))
+# max number of kept-alive connections per host. Threads wait for a free connection when all are in use
+http_pool_size = int(os.getenv("HTTP_POOL_SIZE", "10"))
 
 mongodb_connection = os.environ["MONGODB_CONNECTION"]
 db_name = os.environ["DB_NAME"]
@@ -58,3 +98,35 @@ max_image_size = int(os.getenv("MAX_IMAGE_SIZE", str(five_mb)))
 max_images_per_uer = int(os.getenv("MAX_IMAGES", "300"))
 
 log_level = int(os.getenv("LOG_LEVEL", str(logging.INFO)))
+
+# GET /extensions responses are cached in memory. Writes made by this process clear the cache right away,
+# the TTL bounds how long changes made by other processes (e.g. sync_extensions) stay invisible
+extensions_cache_size = int(os.getenv("EXTENSIONS_CACHE_SIZE", "256"))
+extensions_cache_ttl = int(os.getenv("EXTENSIONS_CACHE_TTL", "300"))
+extension_cache_size = int(os.getenv("EXTENSION_CACHE_SIZE", "1024"))
+# first pages of GET /extensions are pre-encoded for every sort order and API version. Same as with the cache above,
+# writes made by this process trigger a rebuild and changes made by other processes show up after max age
+catalog_snapshot_max_age = int(os.getenv("CATALOG_SNAPSHOT_MAX_AGE", "300"))
+search_index_max_age = int(os.getenv("SEARCH_INDEX_MAX_AGE", "300"))
+suggest_cache_size = int(os.getenv("SUGGEST_CACHE_SIZE", "1024"))
+# repo info, manifest.json and versions.json (including "not found" and validation errors) are reused by
+# GET /validate-project and POST /extensions for the same project during this many seconds
+project_validation_cache_size = int(os.getenv("PROJECT_VALIDATION_CACHE_SIZE", "256"))
+project_validation_cache_ttl = int(os.getenv("PROJECT_VALIDATION_CACHE_TTL", "60"))
+# GET /misc/ulauncher-releases/<version> is answered from an in-memory index of all releases that is refreshed
+# in the background when it gets older than max age. A request for an unknown version refreshes it right away,
+# but not more often than once per ULAUNCHER_RELEASES_MISS_REFRESH_INTERVAL seconds
+ulauncher_releases_max_age = int(os.getenv("ULAUNCHER_RELEASES_MAX_AGE", "600"))
+ulauncher_releases_miss_refresh_interval = int(os.getenv("ULAUNCHER_RELEASES_MISS_REFRESH_INTERVAL", "60"))
+# Auth0 signing keys are fetched on startup and refreshed in the background when they get older than max age.
+# A token signed with an unknown key refreshes them right away, but not more often than once per
+# AUTH0_KEYS_MISS_REFRESH_INTERVAL seconds
+auth0_keys_max_age = int(os.getenv("AUTH0_KEYS_MAX_AGE", "3600"))
+auth0_keys_miss_refresh_interval = int(os.getenv("AUTH0_KEYS_MISS_REFRESH_INTERVAL", "60"))
+# claims of verified tokens are reused until the token expires, but not longer than AUTH_TOKEN_CACHE_TTL seconds
+auth_token_cache_size = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "4096"))
+auth_token_cache_ttl = int(os.getenv("AUTH_TOKEN_CACHE_TTL", "3600"))
+# comma-separated Auth0 user IDs (e.g. "github|123") allowed to see GET /misc/cache-stats. Nobody if it's not set
+cache_stats_users = frozenset(u.strip() for u in os.getenv("CACHE_STATS_USERS", "").split(",") if u.strip())
+# responses smaller than this are sent uncompressed
+compression_min_size = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
@@ -5,20 +5,28 @@ import os
 import re
 import sys
 import traceback
+from typing import Any
 
 from pymongo import MongoClient
+from pymongo.collation import Collation
 from pymongo.collection import Collection
 
 from ext_api.config import db_name, mongodb_connection
-from ext_api.entities import Extension, Migration
+from ext_api.entities import Extension, GithubCacheEntry, Migration, SyncState
 
 client = MongoClient(mongodb_connection)  #  type: ignore
 db = client[db_name]  #  type: ignore
 logger: logging.Logger = logging.getLogger(__name__)
 migration_collection: Collection[Migration] = db.Migrations  # type: ignore
 extension_collection: Collection[Extension] = db.Extensions  # type: ignore
+github_cache_collection: Collection[GithubCacheEntry] = db.GithubCache  # type: ignore
+sync_state_collection: Collection[SyncState] = db.SyncState  # type: ignore
+# GitHub owner and repo names are case-insensitive
+project_path_collation = Collation(locale="en", strength=2)
+# extension fields that are never returned by the API: Mongo's _id and sync state
+default_projection: dict[str, Any] = {"_id": 0, "GithubHeadSha": 0}
 
-__version__: int = 4
+__version__: int = 8
 
 
 class DbMigrationError(Exception):
@@ -98,6 +106,12 @@ def create_indexes() -> None:
 
     extension_collection.create_index("ID", unique=True)
     extension_collection.create_index("User")
-    extension_collection.create_index([("Published", 1), ("CreatedAt", -1)])
-    extension_collection.create_index([("Published", 1), ("GithubStars", -1)])
+    extension_collection.create_index([("Published", 1), ("CreatedAt", -1), ("ID", -1)])
+    extension_collection.create_index([("Published", 1), ("GithubStars", -1), ("ID", -1)])
     extension_collection.create_index([("ProjectPath", "text"), ("Description", "text")])
+    extension_collection.create_index("ProjectPath", collation=project_path_collation)
+
+    github_cache_collection.create_index("Url", unique=True)
+
+    sync_state_collection.create_index("Key", unique=True)
+    sync_state_collection.create_index("SyncedAt")
@@ -16,6 +16,8 @@ class Extension(TypedDict):
     Published: bool
     CreatedAt: NotRequired[datetime.datetime]
     UpdatedAt: NotRequired[datetime.datetime]
+    # HEAD commit of the default branch that SupportedVersions were read from
+    GithubHeadSha: NotRequired[str]
 
 
 class Migration(TypedDict):
@@ -23,9 +25,35 @@ class Migration(TypedDict):
     CreatedAt: datetime.datetime
 
 
+class GithubCacheEntry(TypedDict):
+    Url: str
+    Body: bytes
+    ETag: NotRequired[str]
+    LastModified: NotRequired[str]
+    UpdatedAt: datetime.datetime
+
+
+class SyncState(TypedDict):
+    """
+    Either the state of a sync_extensions shard ("shard:<index>/<count>" key)
+    or a checkpoint of an extension synced by the current run ("ext:<ID>" key)
+    """
+
+    Key: str
+    # shard lease. Other runs of the same shard wait until it's released or expires
+    Owner: NotRequired[str]
+    LeaseExpiresAt: NotRequired[datetime.datetime]
+    RunStartedAt: NotRequired[datetime.datetime]
+    # missing if the last run was interrupted
+    RunFinishedAt: NotRequired[datetime.datetime]
+    SyncedAt: NotRequired[datetime.datetime]
+
+
 class RepoInfo(TypedDict):
     stargazers_count: int
     default_branch: str
+    # SHA of the last commit in the default branch. Only returned by get_repos_info()
+    head_sha: NotRequired[str]
 
 
 class Manifest(TypedDict):
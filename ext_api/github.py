@@ -1,25 +1,140 @@
 import base64
+import contextvars
+import io
+import itertools
 import json
 import logging
 import re
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from functools import partial
+from http.client import HTTPMessage
 from typing import Any, TypedDict
-from urllib.error import HTTPError
+from urllib.error import HTTPError, URLError
 from urllib.parse import quote
-from urllib.request import Request, urlopen
 
-from ext_api.config import github_api_base_url, github_api_token, github_api_user, github_raw_base_url
+import urllib3
+from urllib3.util import Retry, Timeout
+
+from ext_api.config import (
+    github_api_base_url,
+    github_api_credentials,
+    github_connect_timeout,
+    github_graphql_url,
+    github_max_retries,
+    github_rate_limit_reserve,
+    github_raw_base_url,
+    github_read_timeout,
+    http_pool_size,
+    project_validation_cache_size,
+    project_validation_cache_ttl,
+)
 from ext_api.entities import Manifest, RepoInfo
+from ext_api.helpers.cache import LRUCache
+from ext_api.helpers.http_client import http
+from ext_api.helpers.token_pool import TokenPool
+from ext_api.repositories.github_cache import delete_cached_response, get_cached_response, save_cached_response
 
 logger = logging.getLogger(__name__)
 
+HTTP_NOT_MODIFIED = 304
+# max number of repositories fetched with one GraphQL query
+GRAPHQL_BATCH_SIZE = 100
+# max page size of GitHub REST API lists
+PAGE_SIZE = 100
+HTTP_BAD_REQUEST = 400
+HTTP_NOT_FOUND = 404
+
+
+class GithubRetry(Retry):
+    """
+    Also retries 403 responses with Retry-After header, which GitHub sends when secondary rate limits are exceeded.
+    403 without it means that the primary rate limit is exhausted (or access is denied), which retries won't fix
+    """
 
-def create_authenticated_request(url: str):
-    req = Request(url)
-    if github_api_user and github_api_token:
-        credentials = f"{github_api_user}:{github_api_token}"
+    RETRY_AFTER_STATUS_CODES = frozenset([403, *Retry.RETRY_AFTER_STATUS_CODES])
+
+
+github_timeout = Timeout(connect=github_connect_timeout, read=github_read_timeout)
+github_retry = GithubRetry(
+    total=github_max_retries,
+    status_forcelist=[500, 502, 503, 504],
+    backoff_factor=0.5,
+    backoff_jitter=0.5,
+    backoff_max=10,
+    retry_after_max=60,
+    # the last response is returned when retries are exhausted, so that it's converted to HTTPError below
+    raise_on_status=False,
+)
+# GraphQL queries are sent with POST, but don't change anything, so they are safe to retry
+github_graphql_retry = github_retry.new(allowed_methods=["POST"])
+
+# tracks rate limits of every token. Background jobs wait for it before making GitHub API requests
+token_pool = TokenPool(github_api_credentials, reserve=github_rate_limit_reserve)
+# fetches manifest.json and versions.json of a project concurrently
+_files_executor = ThreadPoolExecutor(max_workers=http_pool_size, thread_name_prefix="github-files")
+# values are (result, None) or (None, validation error)
+validation_cache: LRUCache[tuple[str, str], tuple[Any, "ProjectValidationError | None"]] = LRUCache(
+    maxsize=project_validation_cache_size, ttl=project_validation_cache_ttl
+)
+
+
+def create_auth_headers(credentials: str) -> dict[str, str]:
+    """
+    `credentials` is "<user>:<token>" from token_pool, or empty string for unauthenticated requests
+    """
+    headers = {"User-Agent": "ext-api.ulauncher.io"}
+    if credentials:
         encoded_credentials = base64.b64encode(credentials.encode("ascii"))
-        req.add_header("Authorization", f"Basic {encoded_credentials.decode('ascii')}")
-    return req
+        headers["Authorization"] = f"Basic {encoded_credentials.decode('ascii')}"
+    return headers
+
+
+def _fetch(url: str) -> bytes:
+    """
+    Sends GET request through the shared connection pool and returns response body.
+    Responses with ETag or Last-Modified are stored in the DB. Next requests to the same URL are conditional,
+    and the stored body is returned on 304 (such responses don't count against GitHub rate limit).
+    API requests are spread between tokens by token_pool, and wait for it if they are background ones
+    (raw files don't count against the rate limit)
+    Raises urllib.error.HTTPError for error responses (same as urlopen)
+    Raises urllib.error.URLError if GitHub is unreachable
+    """
+    cached = get_cached_response(url)
+    credentials = token_pool.acquire() if url.startswith(github_api_base_url) else token_pool.select()
+    headers = create_auth_headers(credentials)
+    if cached and "ETag" in cached:
+        headers["If-None-Match"] = cached["ETag"]
+    if cached and "LastModified" in cached:
+        headers["If-Modified-Since"] = cached["LastModified"]
+
+    try:
+        response = http.request("GET", url, headers=headers, timeout=github_timeout, retries=github_retry)
+    except urllib3.exceptions.HTTPError as e:
+        raise URLError(e) from e
+
+    logger.debug("X-RateLimit-Remaining: %s", response.headers.get("X-RateLimit-Remaining"))
+    token_pool.update(credentials, response.headers)
+    if response.status == HTTP_NOT_MODIFIED and cached:
+        return cached["Body"]
+
+    if response.status == HTTP_NOT_FOUND and cached:
+        delete_cached_response(url)
+    _raise_for_status(url, response)
+
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if etag or last_modified:
+        save_cached_response(url, response.data, etag, last_modified)
+    return response.data
+
+
+def _raise_for_status(url: str, response: urllib3.BaseHTTPResponse) -> None:
+    if response.status >= HTTP_BAD_REQUEST:
+        headers = HTTPMessage()
+        for name, value in response.headers.items():
+            headers[name] = value
+        raise HTTPError(url, response.status, response.reason or "", headers, io.BytesIO(response.data))
 
 
 def get_project_path(github_url: str) -> str:
@@ -30,9 +145,6 @@ def get_project_path(github_url: str) -> str:
     return match.group(2)
 
 
-HTTP_NOT_FOUND = 404
-
-
 def _get_json(repo_path: str, commit: str, blob_path: str):
     """
     Fetches {blob_path}.json from the given repo_path at the specified commit.
@@ -46,15 +158,13 @@ def _get_json(repo_path: str, commit: str, blob_path: str):
         commit_quoted = quote(commit, safe="")
         blob_path_quoted = quote(f"{blob_path}.json", safe="")
         url = f"{github_raw_base_url.rstrip('/')}/{repo_path_quoted}/{commit_quoted}/{blob_path_quoted}"
-    req = create_authenticated_request(url)
     try:
-        response = urlopen(req)
+        body = _fetch(url)
     except HTTPError as e:
         if e.status == HTTP_NOT_FOUND:
             raise JsonFileNotFoundError(f'Unable to find file "{blob_path}.json" in branch "{commit}"') from e
         raise
-    logger.debug("X-RateLimit-Remaining: %s", response.headers.get("X-RateLimit-Remaining"))
-    return json.load(response)
+    return json.loads(body)
 
 
 def get_repo_info(repo_path: str) -> RepoInfo:
@@ -64,15 +174,90 @@ def get_repo_info(repo_path: str) -> RepoInfo:
     Raises ProjectValidationError
     """
     url = f"{github_api_base_url.rstrip('/')}/repos/{quote(repo_path, safe='/')}"
-    req = create_authenticated_request(url)
     try:
-        response = urlopen(req)
+        body = _fetch(url)
     except HTTPError as e:
         if e.status == HTTP_NOT_FOUND:
             raise ProjectNotFoundError(f"Github project not found: https://github.com/{repo_path}") from e
         raise
-    logger.debug("X-RateLimit-Remaining: %s", response.headers.get("X-RateLimit-Remaining"))
-    return json.load(response)
+    return json.loads(body)
+
+
+def get_releases(repo_path: str) -> list[dict[str, Any]]:
+    """
+    Fetches all releases of the repository, newest first (walks through all pages).
+    Unchanged pages are revalidated with conditional requests
+    Raises urllib.error.HTTPError
+    Raises urllib.error.URLError if GitHub is unreachable
+    """
+    releases: list[dict[str, Any]] = []
+    for page in itertools.count(1):
+        url = f"{github_api_base_url.rstrip('/')}/repos/{quote(repo_path, safe='/')}/releases"
+        batch: list[dict[str, Any]] = json.loads(_fetch(f"{url}?per_page={PAGE_SIZE}&page={page}"))
+        releases += batch
+        if len(batch) < PAGE_SIZE:
+            break
+    return releases
+
+
+def get_repos_info(repo_paths: list[str]) -> dict[str, RepoInfo]:
+    """
+    Fetches stars, default branch and its HEAD commit SHA of up to GRAPHQL_BATCH_SIZE repositories
+    with one GitHub GraphQL API request (costs 1 point of GraphQL rate limit instead of a request per repo).
+    Repositories that are not found are missing from the result.
+    GraphQL API requires authentication (GITHUB_API_USER and GITHUB_API_TOKEN).
+    Raises urllib.error.HTTPError
+    Raises urllib.error.URLError if GitHub is unreachable
+    Raises GraphQLError
+    """
+    assert len(repo_paths) <= GRAPHQL_BATCH_SIZE, f"Max {GRAPHQL_BATCH_SIZE} repositories per request"
+    if not repo_paths:
+        return {}
+
+    params: list[str] = []
+    fields: list[str] = []
+    variables: dict[str, str] = {}
+    for i, repo_path in enumerate(repo_paths):
+        variables[f"owner{i}"], _, variables[f"name{i}"] = repo_path.partition("/")
+        params.append(f"$owner{i}: String!, $name{i}: String!")
+        fields.append(
+            f"r{i}: repository(owner: $owner{i}, name: $name{i}) "
+            "{ stargazerCount defaultBranchRef { name target { oid } } }"
+        )
+    query = f"query({', '.join(params)}) {{ {' '.join(fields)} }}"
+
+    headers = {**create_auth_headers(token_pool.select()), "Content-Type": "application/json"}
+    try:
+        response = http.request(
+            "POST",
+            github_graphql_url,
+            body=json.dumps({"query": query, "variables": variables}),
+            headers=headers,
+            timeout=github_timeout,
+            retries=github_graphql_retry,
+        )
+    except urllib3.exceptions.HTTPError as e:
+        raise URLError(e) from e
+    _raise_for_status(github_graphql_url, response)
+
+    payload: dict[str, Any] = json.loads(response.data)
+    # missing repositories are returned as null with NOT_FOUND errors. Other errors fail the whole batch
+    all_errors: list[dict[str, Any]] = payload.get("errors") or []
+    errors = [e for e in all_errors if e.get("type") != "NOT_FOUND"]
+    if errors or not isinstance(payload.get("data"), dict):
+        raise GraphQLError(f"GitHub GraphQL API error: {errors or payload}")
+
+    result: dict[str, RepoInfo] = {}
+    for i, repo_path in enumerate(repo_paths):
+        repo = payload["data"].get(f"r{i}")
+        # empty repositories don't have a default branch
+        if repo and repo.get("defaultBranchRef"):
+            result[repo_path] = RepoInfo(
+                stargazers_count=repo["stargazerCount"],
+                default_branch=repo["defaultBranchRef"]["name"],
+                head_sha=repo["defaultBranchRef"]["target"]["oid"],
+            )
+    return result
 
 
 class SupportedVersion(TypedDict):
@@ -180,11 +365,75 @@ def get_versions(project_path: str, repo_info: RepoInfo | None = None) -> Extens
 
     try:
         versions_file_content = _get_json(project_path, repo_info["default_branch"], "versions")
+    except JsonFileNotFoundError:
+        raise
     except Exception as e:
         raise VersionsValidationError(f"versions.json validation error: {e}") from e
     return _read_versions_file(versions_file_content)
 
 
+def _get_validation_result[T](kind: str, project_path: str, load: Callable[[], T]) -> T:
+    """
+    Returns result of `load` cached in validation_cache. ProjectValidationError is cached and raised again,
+    other errors (e.g. network errors) are not cached. Concurrent calls for the same project share one fetch
+    """
+
+    def load_result() -> tuple[T | None, ProjectValidationError | None]:
+        try:
+            return load(), None
+        except ProjectValidationError as e:
+            return None, e
+
+    result, error = validation_cache.get_or_load((kind, project_path.lower()), load_result)
+    if error:
+        raise error.with_traceback(None)
+    return result
+
+
+def get_repo_info_cached(project_path: str) -> RepoInfo:
+    """
+    Same as get_repo_info(), but the result is reused for PROJECT_VALIDATION_CACHE_TTL seconds
+    """
+    return _get_validation_result("repo_info", project_path, lambda: get_repo_info(project_path))
+
+
+def get_manifest_cached(project_path: str, repo_info: RepoInfo) -> Manifest:
+    """
+    Same as get_manifest(), but the result is reused for PROJECT_VALIDATION_CACHE_TTL seconds
+    """
+    return _get_validation_result("manifest", project_path, lambda: get_manifest(project_path, repo_info))
+
+
+def get_versions_cached(project_path: str, repo_info: RepoInfo) -> ExtensionVersions:
+    """
+    Same as get_versions(), but the result is reused for PROJECT_VALIDATION_CACHE_TTL seconds
+    """
+    return _get_validation_result("versions", project_path, lambda: get_versions(project_path, repo_info))
+
+
+def get_manifest_and_versions(
+    project_path: str, repo_info: RepoInfo, cached: bool = False
+) -> tuple[Future[Manifest], Future[ExtensionVersions]]:
+    """
+    Fetches manifest.json and versions.json concurrently (one round trip instead of two).
+    Returns completed futures. Their result() returns the parsed file or raises the same errors
+    as get_manifest() and get_versions(), so a missing versions.json can still be treated as optional.
+    `cached` reuses results the same way as get_manifest_cached() and get_versions_cached()
+    """
+    if cached:
+        load_manifest = partial(get_manifest_cached, project_path, repo_info)
+        load_versions = partial(get_versions_cached, project_path, repo_info)
+    else:
+        load_manifest = partial(get_manifest, project_path, repo_info)
+        load_versions = partial(get_versions, project_path, repo_info)
+
+    # keeps request priority of the caller
+    manifest = _files_executor.submit(contextvars.copy_context().run, load_manifest)
+    versions = _files_executor.submit(contextvars.copy_context().run, load_versions)
+    wait([manifest, versions])  # type: ignore
+    return manifest, versions
+
+
 def extract_major(version: str) -> str | None:
     match = re.match(r"^[^\d]?(\d+)", version)
     return match.group(1) if match else None
@@ -194,6 +443,10 @@ class InvalidGithubUrlError(Exception):
     pass
 
 
+class GraphQLError(Exception):
+    pass
+
+
 class ProjectValidationError(Exception):
     pass
 
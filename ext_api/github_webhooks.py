@@ -0,0 +1,54 @@
+import hashlib
+import hmac
+import logging
+from functools import partial
+from typing import Any
+
+from ext_api.config import github_webhook_delay, github_webhook_secret
+from ext_api.helpers.debounce import Debouncer
+from ext_api.sync_extensions import resync_extension
+
+logger = logging.getLogger(__name__)
+_debouncer = Debouncer(delay=github_webhook_delay)
+SIGNATURE_PREFIX = "sha256="
+
+
+class InvalidSignatureError(Exception):
+    pass
+
+
+def verify_signature(body: bytes, signature: str | None, secret: str = github_webhook_secret) -> None:
+    """
+    Checks X-Hub-Signature-256 header of a webhook request.
+    Raises InvalidSignatureError
+    """
+    if not secret:
+        msg = "GitHub webhooks are disabled"
+        raise InvalidSignatureError(msg)
+    if not signature or not signature.startswith(SIGNATURE_PREFIX):
+        msg = "Missing or malformed X-Hub-Signature-256 header"
+        raise InvalidSignatureError(msg)
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    if not hmac.compare_digest(signature.removeprefix(SIGNATURE_PREFIX), expected):
+        msg = "Invalid webhook signature"
+        raise InvalidSignatureError(msg)
+
+
+def handle_event(event: str, payload: dict[str, Any]) -> bool:
+    """
+    Schedules resync of the repository's extension on star events and pushes to the default branch.
+    Events of the same repository that arrive within GITHUB_WEBHOOK_DELAY seconds result in one resync.
+    Returns False if the event is ignored
+    """
+    repo = payload.get("repository")
+    if event not in {"push", "star"} or not isinstance(repo, dict):
+        return False
+    project_path = repo.get("full_name")  # type: ignore
+    if not isinstance(project_path, str):
+        return False
+    if event == "push" and payload.get("ref") != f"refs/heads/{repo.get('default_branch')}":  # type: ignore
+        return False
+
+    logger.info("Got %s event of %s", event, project_path)
+    _debouncer.call(project_path.lower(), partial(resync_extension, project_path))
+    return True
@@ -1,7 +1,10 @@
+import hashlib
+import logging
 import os
+import threading
+import time
 from collections.abc import Callable
-from functools import lru_cache
-from typing import ParamSpec, TypeVar
+from typing import Any, ParamSpec, TypedDict, TypeVar
 
 import jwt
 from bottle import request
@@ -9,44 +12,172 @@ from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives.asymmetric import rsa
 from cryptography.x509 import load_pem_x509_certificate
 
+from ext_api.config import (
+    auth0_keys_max_age,
+    auth0_keys_miss_refresh_interval,
+    auth_token_cache_size,
+    auth_token_cache_ttl,
+)
+from ext_api.helpers.cache import LRUCache
 from ext_api.helpers.http_client import http
 from ext_api.helpers.response import ErrorResponse
 
+logger = logging.getLogger(__name__)
+
 AUTH0_DOMAIN = os.environ["AUTH0_DOMAIN"]
 AUTH0_CLIENT_ID = os.environ["AUTH0_CLIENT_ID"]
-AUTH0_PEM_URL = os.getenv("AUTH0_PEM_URL", f"https://{AUTH0_DOMAIN}/pem")
+AUTH0_JWKS_URL = os.getenv("AUTH0_JWKS_URL", f"https://{AUTH0_DOMAIN}/.well-known/jwks.json")
+# if it's set, tokens are verified with this single certificate instead of the JWKS keys
+AUTH0_PEM_URL = os.getenv("AUTH0_PEM_URL")
 
 HTTP_OK = 200
 
 
-@lru_cache(maxsize=1)
-def get_signing_key() -> rsa.RSAPublicKey:
+class SigningKeysStats(TypedDict):
+    keys: int
+    refreshed_at: float | None
+
+
+class SigningKeys:
     """
-    get key and cache forever in memory
+    Public keys that Auth0 signs tokens with, by key ID ("kid").
+
+    They are fetched by start() when the server starts, so the first request doesn't wait for them,
+    and refreshed in a background thread when they get older than `max_age` seconds.
+    A token signed with an unknown key (e.g. right after key rotation) refreshes them right away,
+    but not more often than once per `miss_refresh_interval` seconds
     """
-    resp = http.request("GET", AUTH0_PEM_URL)
+
+    def __init__(self, jwks_url: str, pem_url: str | None, max_age: float, miss_refresh_interval: float) -> None:
+        self.jwks_url = jwks_url
+        self.pem_url = pem_url
+        self.max_age = max_age
+        self.miss_refresh_interval = miss_refresh_interval
+        self.refreshed_at: float | None = None
+        # the key from pem_url has no ID
+        self.keys: dict[str | None, rsa.RSAPublicKey] = {}
+        self._attempted_at = 0.0
+        self._refresh_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._refresh_scheduled = False
+
+    def start(self) -> None:
+        try:
+            self.refresh(min_interval=0)
+        except Exception:
+            logger.exception("Failed to fetch Auth0 signing keys")
+
+    def get(self, kid: str | None) -> rsa.RSAPublicKey:
+        key = self._find(kid)
+        if key is None:
+            self.refresh(min_interval=self.miss_refresh_interval)
+            key = self._find(kid)
+            if key is None:
+                msg = f"Unknown signing key {kid}"
+                raise KeyError(msg)
+        elif time.time() - (self.refreshed_at or 0) >= self.max_age:
+            self.schedule_refresh()
+        return key
+
+    def refresh(self, min_interval: float) -> None:
+        """
+        Does nothing if keys were refreshed (or failed to) less than `min_interval` seconds ago.
+        Concurrent calls wait for the one that is already refreshing
+        """
+        started_at = time.time()
+        with self._refresh_lock:
+            if started_at - self._attempted_at < min_interval or self._attempted_at > started_at:
+                return
+            self._attempted_at = time.time()
+            keys = self._fetch()
+            removed = self.keys.keys() - keys.keys()
+            self.keys = keys
+            self.refreshed_at = time.time()
+        if removed:
+            # tokens signed with revoked keys must be verified again
+            verified_tokens.clear()
+        logger.info("Loaded %s Auth0 signing keys", len(keys))
+
+    def schedule_refresh(self) -> None:
+        with self._lock:
+            if self._refresh_scheduled:
+                return
+            self._refresh_scheduled = True
+        threading.Thread(target=self._refresh_in_background, name="auth0-keys", daemon=True).start()
+
+    def stats(self) -> SigningKeysStats:
+        return SigningKeysStats(keys=len(self.keys), refreshed_at=self.refreshed_at)
+
+    def _find(self, kid: str | None) -> rsa.RSAPublicKey | None:
+        keys = self.keys
+        if kid is None and len(keys) == 1:
+            return next(iter(keys.values()))
+        return keys.get(kid)
+
+    def _refresh_in_background(self) -> None:
+        try:
+            self.refresh(min_interval=self.max_age)
+        except Exception:
+            logger.exception("Failed to refresh Auth0 signing keys")
+        finally:
+            with self._lock:
+                self._refresh_scheduled = False
+
+    def _fetch(self) -> dict[str | None, rsa.RSAPublicKey]:
+        if self.pem_url:
+            cert_obj = load_pem_x509_certificate(_download(self.pem_url), default_backend())
+            pkey = cert_obj.public_key()
+            if not isinstance(pkey, rsa.RSAPublicKey):
+                msg = "Auth0 public key is not an RSA key"
+                raise TypeError(msg)
+            return {None: pkey}
+
+        # keys of unsupported types are skipped
+        jwks: list[jwt.PyJWK] = jwt.PyJWKSet.from_json(_download(self.jwks_url).decode()).keys  # type: ignore
+        keys: dict[str | None, rsa.RSAPublicKey] = {
+            jwk.key_id: jwk.key for jwk in jwks if isinstance(jwk.key, rsa.RSAPublicKey)
+        }
+        if not keys:
+            msg = "Auth0 JWKS has no RSA keys"
+            raise TypeError(msg)
+        return keys
+
+
+def _download(url: str) -> bytes:
+    resp = http.request("GET", url)
     if resp.status != HTTP_OK:
-        raise Exception(f"Could not download auth0 cert. {resp.data}")
-    cert_obj = load_pem_x509_certificate(resp.data, default_backend())
-    pkey = cert_obj.public_key()
+        raise Exception(f"Could not download auth0 keys. {resp.data}")
+    return resp.data
 
-    if not isinstance(pkey, rsa.RSAPublicKey):
-        msg = "Auth0 public key is not an RSA key"
-        raise TypeError(msg)
 
-    return pkey
+signing_keys = SigningKeys(
+    AUTH0_JWKS_URL,
+    AUTH0_PEM_URL,
+    max_age=auth0_keys_max_age,
+    miss_refresh_interval=auth0_keys_miss_refresh_interval,
+)
+# claims of verified tokens by SHA-256 digest of the token. They expire with the token
+verified_tokens: LRUCache[bytes, dict[str, Any]] = LRUCache(maxsize=auth_token_cache_size, ttl=auth_token_cache_ttl)
 
 
-def parse_token(token: str) -> dict[str, str]:
+def parse_token(token: str) -> dict[str, Any]:
     try:
         assert token, "Token is empty"
         if " " in token:
             # this is an Authorization header. Take string after space
             token = token.split(" ")[1]
 
-        return jwt.decode(token, get_signing_key(), audience=AUTH0_CLIENT_ID, algorithms=["RS256"])
+        digest = hashlib.sha256(token.encode()).digest()
+        claims = verified_tokens.get(digest)
+        if claims is None:
+            kid = jwt.get_unverified_header(token).get("kid")
+            claims = jwt.decode(token, signing_keys.get(kid), audience=AUTH0_CLIENT_ID, algorithms=["RS256"])
+            # tokens without expiration time aren't cached
+            if isinstance(claims.get("exp"), int | float):
+                verified_tokens.set(digest, claims, ttl=claims["exp"] - time.time())
     except Exception as e:
         raise AuthError(f"Unauthorized. {e}") from e
+    return claims
 
 
 class AuthError(Exception):
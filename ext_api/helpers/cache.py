@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from concurrent.futures import Future
+from typing import TypedDict
+
+
+class CacheStats(TypedDict):
+    size: int
+    maxsize: int
+    ttl: float
+    hits: int
+    misses: int
+
+
+class LRUCache[K: Hashable, V]:
+    """
+    Thread-safe in-memory cache that evicts least recently used entries when it's full
+    and treats entries older than `ttl` seconds as missing.
+
+    `generation` changes on every delete() and clear(). Pass the generation read before loading a value to set(),
+    so a value loaded before an invalidation isn't cached after it
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._loading: dict[K, Future[V]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: K, value: V, ttl: float | None = None, generation: int | None = None) -> None:
+        """
+        `ttl` can make the entry expire sooner than the cache TTL (but not later).
+        The value isn't cached if `generation` is passed and the cache was invalidated since then
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if self.maxsize <= 0 or ttl <= 0:
+            return
+
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, key: K, load: Callable[[], V]) -> V:
+        """
+        Returns cached value or calls `load` and caches its result.
+        Concurrent calls for the same missing key wait for the first one instead of calling `load` again.
+        Exceptions are not cached, but are raised in all waiting calls
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            loading = self._loading.get(key)
+            if loading is None:
+                loading = self._loading[key] = Future()
+                is_loader = True
+            else:
+                is_loader = False
+        if not is_loader:
+            return loading.result()
+
+        generation = self.generation
+        try:
+            value = load()
+        except BaseException as e:
+            loading.set_exception(e)
+            raise
+        else:
+            self.set(key, value, generation=generation)
+            loading.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                del self._loading[key]
+
+    def delete(self, key: K) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            self.generation += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                size=len(self._entries), maxsize=self.maxsize, ttl=self.ttl, hits=self.hits, misses=self.misses
+            )
@@ -0,0 +1,91 @@
+import gzip
+from collections.abc import Callable
+from functools import wraps
+from typing import ParamSpec, TypeVar
+
+from bottle import request, response
+
+from ext_api.config import compression_min_size
+
+try:
+    import brotli  # type: ignore
+except ImportError:  # brotli is optional. Only gzip is used without it
+    brotli = None
+
+Param = ParamSpec("Param")
+RetType = TypeVar("RetType")
+
+# compression levels for responses that are compressed once and then served from memory
+CACHED_LEVELS = {"br": 9, "gzip": 9}
+# compression levels for responses that are compressed on every request
+ON_THE_FLY_LEVELS = {"br": 4, "gzip": 6}
+
+
+def supported_encodings() -> list[str]:
+    """
+    Returns supported content codings in the order of preference
+    """
+    return ["br", "gzip"] if brotli else ["gzip"]
+
+
+def choose_encoding(accept_encoding: str | None) -> str | None:
+    """
+    Picks the best supported encoding from Accept-Encoding header value. Returns None for identity
+    """
+    if not accept_encoding:
+        return None
+
+    accepted: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding.strip().lower()] = quality
+
+    for encoding in supported_encodings():
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+
+    return None
+
+
+def compress(data: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "br" and brotli:
+        return brotli.compress(data, quality=level)  # type: ignore
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def compress_response[**Param, RetType](callback: Callable[Param, RetType]) -> Callable[Param, RetType | bytes]:
+    """
+    Bottle plugin that compresses large str/bytes responses according to Accept-Encoding.
+    Responses that already have Content-Encoding (e.g. precompressed cached responses) are passed as is.
+    Must be installed before JSONPlugin to see serialized bodies
+    """
+
+    @wraps(callback)
+    def wrapper(*args: Param.args, **kwargs: Param.kwargs) -> RetType | bytes:
+        body = callback(*args, **kwargs)
+        if not isinstance(body, str | bytes) or "Content-Encoding" in response.headers:
+            return body
+
+        data = body.encode(response.charset) if isinstance(body, str) else body
+        if len(data) < compression_min_size:
+            return body
+
+        response.add_header("Vary", "Accept-Encoding")
+        encoding = choose_encoding(request.get_header("Accept-Encoding"))
+        if not encoding:
+            return body
+
+        response.set_header("Content-Encoding", encoding)
+        return compress(data, encoding, ON_THE_FLY_LEVELS[encoding])
+
+    return wrapper
@@ -0,0 +1,57 @@
+import logging
+import threading
+from collections.abc import Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class Debouncer:
+    """
+    Coalesces repeated calls for the same key into one call that runs in a background thread `delay` seconds
+    after the first of them. Only one call per key runs at a time: calls made while the function is running
+    schedule one more run `delay` seconds after it finishes
+    """
+
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self._pending: dict[Hashable, threading.Timer] = {}
+        self._running: set[Hashable] = set()
+        # functions to run again after the running call
+        self._queued: dict[Hashable, Callable[[], object]] = {}
+        self._lock = threading.Lock()
+
+    def call(self, key: Hashable, fn: Callable[[], object]) -> bool:
+        """
+        Returns False if a call for this key is already scheduled
+        """
+        with self._lock:
+            if key in self._pending or key in self._queued:
+                return False
+            if key in self._running:
+                self._queued[key] = fn
+                return True
+            timer = self._schedule(key, fn)
+        timer.start()
+        return True
+
+    def _schedule(self, key: Hashable, fn: Callable[[], object]) -> threading.Timer:
+        timer = threading.Timer(self.delay, self._run, args=(key, fn))
+        timer.daemon = True
+        self._pending[key] = timer
+        return timer
+
+    def _run(self, key: Hashable, fn: Callable[[], object]) -> None:
+        with self._lock:
+            self._pending.pop(key, None)
+            self._running.add(key)
+        try:
+            fn()
+        except Exception:
+            logger.exception("Debounced call %r failed", key)
+        finally:
+            with self._lock:
+                self._running.discard(key)
+                queued = self._queued.pop(key, None)
+                timer = self._schedule(key, queued) if queued else None
+            if timer:
+                timer.start()
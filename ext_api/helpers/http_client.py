@@ -1,4 +1,6 @@
 import certifi
 import urllib3
 
-http = urllib3.PoolManager(cert_reqs="CERT_REQUIRED", ca_certs=certifi.where())
+from ext_api.config import http_pool_size
+
+http = urllib3.PoolManager(cert_reqs="CERT_REQUIRED", ca_certs=certifi.where(), maxsize=http_pool_size, block=True)
@@ -0,0 +1,48 @@
+import datetime
+import json
+from collections.abc import Iterable
+from typing import Any
+
+from bson import ObjectId
+from bson.json_util import default as bson_default
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.UTC)
+
+
+def dumps(obj: Any) -> str:
+    """
+    Drop-in replacement for bson.json_util.dumps with the same output for Extension documents.
+
+    bson.json_util.dumps converts the whole object tree in Python before passing it to json.dumps.
+    Here json.dumps runs on the original object (in C for plain dicts, lists, strings and numbers)
+    and calls back only for values JSON doesn't support, like datetimes
+    """
+    return json.dumps(obj, default=_default)
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    return dumps(obj).encode()
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, datetime.datetime):
+        return {"$date": _format_datetime(obj)}
+    if isinstance(obj, ObjectId):
+        return {"$oid": str(obj)}
+    if isinstance(obj, Iterable) and not isinstance(obj, bytes | dict):
+        # pymongo cursors
+        return list(obj)  # type: ignore
+    return bson_default(obj)
+
+
+def _format_datetime(value: datetime.datetime) -> Any:
+    """
+    Same format as relaxed extended JSON in bson.json_util (naive datetimes are UTC)
+    """
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.UTC)
+    if value < EPOCH or value.utcoffset():
+        return bson_default(value)["$date"]
+    millis = value.microsecond // 1000
+    fraction = f".{millis:03d}" if millis else ""
+    return f"{value:%Y-%m-%dT%H:%M:%S}{fraction}Z"
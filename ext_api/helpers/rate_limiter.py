@@ -0,0 +1,79 @@
+import logging
+import math
+import threading
+import time
+from collections.abc import Mapping
+
+logger = logging.getLogger(__name__)
+
+# extra wait after the reset time in case local clock is behind
+RESET_MARGIN = 1.0
+
+
+class RateLimiter:
+    """
+    Paces requests according to X-RateLimit-Limit, X-RateLimit-Remaining and X-RateLimit-Reset headers of responses.
+
+    Requests are spread evenly over the time left until reset once less than `slow_down_ratio` of the limit is left,
+    and are paused until reset when only `reserve` requests are left (e.g. for requests made by API users)
+    """
+
+    def __init__(self, reserve: int, slow_down_ratio: float = 0.2) -> None:
+        self.reserve = reserve
+        self.slow_down_ratio = slow_down_ratio
+        self.limit: int | None = None
+        self.remaining: int | None = None
+        self.reset_at = 0.0
+        self._next_at = 0.0
+        self._lock = threading.Lock()
+
+    def update(self, headers: Mapping[str, str]) -> None:
+        try:
+            remaining = int(headers["X-RateLimit-Remaining"])
+            reset_at = float(headers["X-RateLimit-Reset"])
+            limit = int(headers["X-RateLimit-Limit"]) if "X-RateLimit-Limit" in headers else None
+        except (KeyError, ValueError):
+            return
+
+        with self._lock:
+            self.remaining = remaining
+            self.reset_at = reset_at
+            self.limit = limit or self.limit
+
+    def headroom(self) -> float:
+        """
+        Returns how many requests are left before the reserve (infinity if it's unknown or the limit has been reset)
+        """
+        with self._lock:
+            if self.remaining is None or time.time() >= self.reset_at:
+                return math.inf
+            return self.remaining - self.reserve
+
+    def acquire(self) -> float:
+        """
+        Reserves a request and returns how many seconds to wait before sending it
+        """
+        with self._lock:
+            now = time.time()
+            if self.remaining is None or now >= self.reset_at:
+                return 0.0
+
+            until_reset = self.reset_at - now
+            if self.remaining <= self.reserve:
+                logger.warning("Rate limit is almost exhausted. Pausing for %.1f sec until reset", until_reset)
+                return until_reset + RESET_MARGIN
+
+            # counts requests that are sent, but haven't got a response with updated headers yet
+            self.remaining -= 1
+            if not self.limit or self.remaining >= self.limit * self.slow_down_ratio:
+                return 0.0
+
+            interval = until_reset / (self.remaining - self.reserve + 1)
+            start_at = max(now, self._next_at)
+            self._next_at = start_at + interval
+            return start_at - now
+
+    def wait(self) -> None:
+        delay = self.acquire()
+        if delay > 0:
+            time.sleep(delay)
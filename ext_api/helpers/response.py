@@ -1,6 +1,11 @@
+import hashlib
+import threading
 from json import dumps
 
-from bottle import HTTPResponse, response
+from bottle import HTTPResponse, request, response
+
+from ext_api.config import compression_min_size
+from ext_api.helpers.compression import CACHED_LEVELS, choose_encoding, compress
 
 
 class ErrorResponse(HTTPResponse):
@@ -20,3 +25,66 @@ class ErrorResponse(HTTPResponse):
         headers["Content-Type"] = "application/json"
 
         super(HTTPResponse, self).__init__(json_body, status, headers)  # type: ignore
+
+
+class EncodedResponse:
+    """
+    JSON response body that is serialized once and then served as is.
+    Its ETag is derived from the content, so it changes only when the body changes.
+    Compressed variants are also created once, on first request for them
+    """
+
+    def __init__(self, body: bytes) -> None:
+        self.body = body
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        self._variants: dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def variant(self, encoding: str) -> bytes:
+        with self._lock:
+            if encoding not in self._variants:
+                self._variants[encoding] = compress(self.body, encoding, CACHED_LEVELS[encoding])
+            return self._variants[encoding]
+
+    def variant_etag(self, encoding: str | None) -> str:
+        """
+        Each content coding is a different representation, so it needs its own strong ETag
+        """
+        return f'{self.etag[:-1]}-{encoding}"' if encoding else self.etag
+
+
+def send_encoded(encoded: EncodedResponse) -> bytes:
+    """
+    Sends pre-encoded JSON body compressed according to Accept-Encoding,
+    or an empty 304 response if client's If-None-Match header matches its ETag
+    """
+    response.content_type = "application/json"
+    encoding = None
+    if len(encoded.body) >= compression_min_size:
+        response.add_header("Vary", "Accept-Encoding")
+        encoding = choose_encoding(request.get_header("Accept-Encoding"))
+
+    etag = encoded.variant_etag(encoding)
+    response.set_header("ETag", etag)
+    if etag_matches(request.get_header("If-None-Match"), etag):
+        response.status = 304
+        return b""
+
+    if encoding:
+        response.set_header("Content-Encoding", encoding)
+        return encoded.variant(encoding)
+
+    return encoded.body
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    If-None-Match uses weak comparison, so W/ prefix is ignored
+    """
+    if not if_none_match:
+        return False
+
+    if if_none_match.strip() == "*":
+        return True
+
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
@@ -0,0 +1,75 @@
+import contextlib
+import itertools
+import threading
+from collections.abc import Iterator, Mapping
+from contextvars import ContextVar
+from typing import Literal
+
+from ext_api.helpers.rate_limiter import RateLimiter
+
+type RequestPriority = Literal["interactive", "background"]
+
+# requests made while handling API requests are interactive. Sync jobs make background requests
+request_priority: ContextVar[RequestPriority] = ContextVar("request_priority", default="interactive")
+
+
+@contextlib.contextmanager
+def background_priority() -> Iterator[None]:
+    """
+    Marks GitHub requests made inside the block (or decorated function) as background ones
+    """
+    token = request_priority.set("background")
+    try:
+        yield
+    finally:
+        request_priority.reset(token)
+
+
+class TokenPool:
+    """
+    Spreads GitHub API requests between several credentials according to their rate limits.
+
+    Every request uses the credentials with the most requests left before `reserve`, and ties are broken round-robin.
+    Background requests are also paced by the RateLimiter of the chosen credentials,
+    and pause when every credentials have only `reserve` requests left, so they never use up the requests
+    that are reserved for interactive ones.
+    An empty list of credentials means unauthenticated requests (empty string is returned for them)
+    """
+
+    def __init__(self, credentials: list[str], reserve: int) -> None:
+        self.limiters = {c: RateLimiter(reserve=reserve) for c in credentials or [""]}
+        self._credentials = list(self.limiters)
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self) -> int | None:
+        """
+        Total rate limit of all credentials (None until it's known from responses)
+        """
+        limits = [limiter.limit for limiter in self.limiters.values() if limiter.limit]
+        return sum(limits) if limits else None
+
+    def select(self) -> str:
+        """
+        Returns credentials with the most requests left without reserving a request
+        """
+        with self._lock:
+            start = next(self._counter) % len(self._credentials)
+        ordered = self._credentials[start:] + self._credentials[:start]
+        return max(ordered, key=lambda c: self.limiters[c].headroom())
+
+    def acquire(self, priority: RequestPriority | None = None) -> str:
+        """
+        Returns credentials for a GitHub API request.
+        Background requests wait if they have to slow down or pause until rate limit reset
+        """
+        credentials = self.select()
+        if (priority or request_priority.get()) == "background":
+            self.limiters[credentials].wait()
+        return credentials
+
+    def update(self, credentials: str, headers: Mapping[str, str]) -> None:
+        # GraphQL API and other resources have separate limits
+        if headers.get("X-RateLimit-Resource", "core") == "core":
+            self.limiters[credentials].update(headers)
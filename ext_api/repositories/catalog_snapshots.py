@@ -0,0 +1,188 @@
+import logging
+import threading
+import time
+from collections.abc import Iterator
+from functools import partial
+from typing import Any, TypedDict
+
+from ext_api.config import catalog_snapshot_max_age
+from ext_api.db import extension_collection
+from ext_api.entities import Extension
+from ext_api.helpers.json_encoder import dumps
+from ext_api.helpers.response import EncodedResponse
+from ext_api.repositories.extensions import PageCursor, default_projection, encode_page_cursor
+from ext_api.repositories.search_index import extension_sort_key
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_LIMIT = 1000
+SNAPSHOT_SORT_BY = ["GithubStars", "CreatedAt"]
+SNAPSHOT_SORT_ORDER = [-1, 1]
+REBUILD_RETRY_DELAY = 10
+
+
+class SnapshotInfo(TypedDict):
+    sort_by: str
+    sort_order: int
+    version: str | None
+    size: int
+    built_at: float
+
+
+class CatalogSnapshot:
+    """
+    Fully encoded first page of GET /extensions for one combination of sorting and API version
+    """
+
+    def __init__(self, sort_by: str, sort_order: int, version: str | None, body: bytes) -> None:
+        self.sort_by = sort_by
+        self.sort_order = sort_order
+        self.version = version
+        self.response = EncodedResponse(body)
+        self.built_at = time.time()
+
+    def info(self) -> SnapshotInfo:
+        return SnapshotInfo(
+            sort_by=self.sort_by,
+            sort_order=self.sort_order,
+            version=self.version,
+            size=len(self.response.body),
+            built_at=self.built_at,
+        )
+
+
+class CatalogSnapshots:
+    """
+    Keeps snapshots of the published catalog for every sort order and API version.
+
+    Writes made by this process schedule a rebuild in a background thread and make current snapshots unavailable
+    until it's done, so stale data is never served. Changes made by other processes (e.g. sync_extensions)
+    are picked up when snapshots get older than `max_age` seconds
+    """
+
+    def __init__(self, max_age: float) -> None:
+        self.max_age = max_age
+        self.build_duration: float | None = None
+        self._snapshots: dict[tuple[str, int, str | None], CatalogSnapshot] = {}
+        self._built_at = 0.0
+        self._generation = 0
+        self._built_generation = -1
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._rebuild_scheduled = False
+        self._retry_at = 0.0
+
+    def get(self, sort_by: str, sort_order: int, version: str | None) -> CatalogSnapshot | None:
+        """
+        Returns None if snapshots are outdated or not built yet. A rebuild is scheduled in that case
+        """
+        with self._lock:
+            is_fresh = self._built_generation == self._generation and time.time() - self._built_at < self.max_age
+            snapshot = self._snapshots.get((sort_by, sort_order, version)) if is_fresh else None
+        if not is_fresh:
+            self.schedule_rebuild()
+        return snapshot
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+        self.schedule_rebuild()
+
+    def schedule_rebuild(self) -> None:
+        with self._lock:
+            if self._rebuild_scheduled or time.time() < self._retry_at:
+                return
+            self._rebuild_scheduled = True
+        threading.Thread(target=self._rebuild_in_background, name="catalog-snapshots", daemon=True).start()
+
+    def _rebuild_in_background(self) -> None:
+        """
+        Rebuilds until snapshots catch up with writes that happened during the previous rebuild
+        """
+        try:
+            while True:
+                self.rebuild()
+                with self._lock:
+                    if self._built_generation == self._generation:
+                        self._rebuild_scheduled = False
+                        return
+        except Exception:
+            logger.exception("Failed to rebuild catalog snapshots")
+            with self._lock:
+                self._rebuild_scheduled = False
+                self._retry_at = time.time() + REBUILD_RETRY_DELAY
+
+    def rebuild(self) -> None:
+        with self._rebuild_lock:
+            with self._lock:
+                generation = self._generation
+            started_at = time.perf_counter()
+            snapshots = build_snapshots(list(extension_collection.find({"Published": True}, default_projection)))
+            with self._lock:
+                self._snapshots = snapshots
+                self._built_at = time.time()
+                self._built_generation = generation
+                self.build_duration = time.perf_counter() - started_at
+            logger.info("Built %s catalog snapshots in %.3f sec", len(snapshots), self.build_duration)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "build_duration": self.build_duration,
+                "is_fresh": self._built_generation == self._generation,
+                "snapshots": [s.info() for s in self._snapshots.values()],
+            }
+
+
+def build_snapshots(extensions: list[Extension]) -> dict[tuple[str, int, str | None], CatalogSnapshot]:
+    """
+    Each body is the same as get_extensions_route() would return for offset=0 and default limit
+    """
+    return {
+        (page["sort_by"], page["sort_order"], page["version"]): CatalogSnapshot(
+            page["sort_by"], page["sort_order"], page["version"], page["body"]
+        )
+        for page in iter_catalog_pages(extensions, first_only=True)
+    }
+
+
+class CatalogPage(TypedDict):
+    sort_by: str
+    sort_order: int
+    version: str | None
+    offset: int
+    body: bytes
+
+
+def iter_catalog_pages(extensions: list[Extension], first_only: bool = False) -> Iterator[CatalogPage]:
+    """
+    Yields encoded GET /extensions pages of SNAPSHOT_LIMIT items for every sort order and API version
+    (None means all versions).
+    Encodes every extension once and assembles pages from the encoded pieces
+    """
+    encoded = {ext["ID"]: dumps(ext) for ext in extensions}
+    versions: list[str | None] = [None, *sorted({v for ext in extensions for v in ext["SupportedVersions"]})]
+
+    for sort_by in SNAPSHOT_SORT_BY:
+        for sort_order in SNAPSHOT_SORT_ORDER:
+            ordered = sorted(extensions, key=partial(extension_sort_key, sort_by=sort_by), reverse=sort_order < 0)
+            for version in versions:
+                found = [ext for ext in ordered if version is None or version in ext["SupportedVersions"]]
+                for offset in range(0, max(len(found), 1), SNAPSHOT_LIMIT):
+                    page = found[offset : offset + SNAPSHOT_LIMIT]
+                    has_more = len(found) > offset + SNAPSHOT_LIMIT
+                    next_cursor = None
+                    if has_more:
+                        last = page[-1]
+                        next_cursor = encode_page_cursor(
+                            PageCursor(sort_by=sort_by, sort_order=sort_order, value=last.get(sort_by), id=last["ID"])
+                        )
+                    data = ", ".join(encoded[ext["ID"]] for ext in page)
+                    rest = dumps({"offset": offset, "has_more": has_more, "next_cursor": next_cursor})
+                    body = f'{{"data": [{data}], {rest[1:]}'.encode()
+                    yield CatalogPage(sort_by=sort_by, sort_order=sort_order, version=version, offset=offset, body=body)
+                    if first_only:
+                        break
+
+
+catalog_snapshots = CatalogSnapshots(max_age=catalog_snapshot_max_age)
@@ -1,11 +1,61 @@
+import base64
+import binascii
 import datetime
+import json
+import logging
+import re
+from collections.abc import Callable, Iterator
 from typing import Any, TypedDict
 
+from bson import json_util
+from pymongo import UpdateOne
 from pymongo.errors import DuplicateKeyError
 
-from ext_api.db import extension_collection
+from ext_api.db import default_projection, extension_collection, project_path_collation
 from ext_api.entities import Extension
 from ext_api.helpers.logging_utils import timeit
+from ext_api.repositories.search_index import Suggestion, apply_projection, search_index, tokenize
+
+logger = logging.getLogger(__name__)
+# fields that can be requested with build_projection()
+projectable_fields: list[str] = [field for field in Extension.__annotations__ if field not in default_projection]
+# named sets of fields. "card" has everything needed to render an extension in a list
+field_presets: dict[str, dict[str, Any]] = {
+    "card": {
+        "ID": 1,
+        "Name": 1,
+        "Description": 1,
+        "Images": {"$slice": 1},
+        "GithubStars": 1,
+        "SupportedVersions": 1,
+    },
+}
+# fields needed to sync an extension with GitHub
+sync_projection: dict[str, Any] = {
+    "_id": 0,
+    "ID": 1,
+    "ProjectPath": 1,
+    "GithubUrl": 1,
+    "SupportedVersions": 1,
+    "GithubStars": 1,
+    "GithubHeadSha": 1,
+}
+_change_listeners: list[Callable[[list[str]], None]] = []
+
+
+def on_extension_change(listener: Callable[[list[str]], None]) -> None:
+    """
+    Registers a callback that is called with IDs of changed extensions after every write to the extensions collection
+    """
+    _change_listeners.append(listener)
+
+
+def _notify_change(*ids: str) -> None:
+    for listener in _change_listeners:
+        try:
+            listener(list(ids))
+        except Exception:
+            logger.exception("Extension change listener %r failed", listener)
 
 
 @timeit
@@ -21,11 +71,14 @@ def put_extension(item: Extension) -> Extension:
         item.update({"CreatedAt": datetime.datetime.now(datetime.UTC)})
 
     try:
-        extension_collection.insert_one(item)
+        # insert a copy, so that generated _id doesn't end up in the returned item
+        extension_collection.insert_one({**item})
     except DuplicateKeyError as e:
         msg = "This extension already exists"
         raise ExtensionAlreadyExistsError(msg) from e
 
+    search_index.upsert(item)
+    _notify_change(item["ID"])
     return item
 
 
@@ -37,7 +90,42 @@ def update_extension(id: str, data: dict[str, Any]) -> Extension:
     if result.modified_count == 0:
         raise ExtensionNotFoundError(f'Extension "{id}" not found')
 
-    return get_extension(id)
+    ext = get_extension(id)
+    search_index.upsert(ext)
+    _notify_change(id)
+    return ext
+
+
+@timeit
+def bulk_update_extensions(updates: dict[str, dict[str, Any]]) -> int:
+    """
+    Sets fields of extensions by ID with one unordered bulk write.
+    Extensions are read back only if this process keeps the search index
+    :returns int: number of modified documents
+    """
+    if not updates:
+        return 0
+
+    now = datetime.datetime.now(datetime.UTC)
+    result = extension_collection.bulk_write(  # type: ignore
+        [UpdateOne({"ID": id}, {"$set": {**data, "UpdatedAt": now}}) for id, data in updates.items()],
+        ordered=False,
+    )
+    modified_count: int = result.modified_count
+    if not modified_count:
+        return 0
+
+    if search_index.is_loaded():
+        found: dict[str, Extension] = {
+            ext["ID"]: ext for ext in extension_collection.find({"ID": {"$in": list(updates)}}, default_projection)
+        }
+        for id in updates:
+            if id in found:
+                search_index.upsert(found[id])
+            else:
+                search_index.remove(id)
+    _notify_change(*updates)
+    return modified_count
 
 
 @timeit
@@ -56,6 +144,9 @@ def delete_extension(id: str, user: str | None = None):
     if result.deleted_count == 0:
         raise ExtensionNotFoundError(f'Extension "{id}" not found')
 
+    search_index.remove(id)
+    _notify_change(id)
+
 
 @timeit
 def add_extension_images(id: str, image_urls: list[str]):
@@ -63,7 +154,10 @@ def add_extension_images(id: str, image_urls: list[str]):
     if result.modified_count == 0:
         raise ExtensionNotFoundError(f'Extension "{id}" not found')
 
-    return get_extension(id)
+    ext = get_extension(id)
+    search_index.upsert(ext)
+    _notify_change(id)
+    return ext
 
 
 @timeit
@@ -73,12 +167,84 @@ def remove_extension_image(id: str, image_idx: list[str]):
         raise ExtensionNotFoundError(f'Extension "{id}" not found')
     extension_collection.update_one({"ID": id}, {"$pull": {"Images": None}})
 
-    return get_extension(id)
+    ext = get_extension(id)
+    search_index.upsert(ext)
+    _notify_change(id)
+    return ext
+
+
+def build_projection(fields: list[str]) -> dict[str, Any]:
+    """
+    Converts a list of field names and/or preset names into a Mongo projection.
+    ID is always included, _id never is.
+    Explicitly listed fields take precedence over presets (e.g. "card,Images" returns all images)
+    """
+    projection: dict[str, Any] = {"_id": 0, "ID": 1}
+    for name in fields:
+        if name in field_presets:
+            for field, value in field_presets[name].items():
+                projection.setdefault(field, value)
+    for name in fields:
+        if name not in field_presets:
+            assert name in projectable_fields, f"Unknown field: {name}"
+            projection[name] = 1
+    return projection
 
 
 class GetExtensionsResult(TypedDict):
     data: list[Extension]
     has_more: bool
+    next_cursor: str | None
+
+
+class PageCursor(TypedDict):
+    sort_by: str
+    sort_order: int
+    value: Any
+    id: str
+
+
+def encode_page_cursor(cursor: PageCursor) -> str:
+    """
+    Returns an opaque URL-safe string that points right after the given extension in the given sort order
+    """
+    payload = json_util.dumps([cursor["sort_by"], cursor["sort_order"], cursor["value"], cursor["id"]])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_page_cursor(encoded: str) -> PageCursor:
+    """
+    :raises InvalidPageCursorError:
+    """
+    try:
+        payload = json_util.loads(
+            base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4)),
+            json_options=json_util.RELAXED_JSON_OPTIONS.with_options(tz_aware=True, tzinfo=datetime.UTC),
+        )
+        sort_by, sort_order, value, id = payload
+        assert isinstance(sort_by, str)
+        assert isinstance(sort_order, int)
+        assert isinstance(id, str)
+    except (AssertionError, binascii.Error, json.JSONDecodeError, TypeError, ValueError) as e:
+        msg = "Invalid cursor"
+        raise InvalidPageCursorError(msg) from e
+
+    return PageCursor(sort_by=sort_by, sort_order=sort_order, value=value, id=id)
+
+
+def _get_after_cursor_filter(after: PageCursor) -> list[dict[str, Any]]:
+    """
+    Returns $or conditions that match extensions after the cursor.
+    Mongo sorts null (and missing) values before all others, but comparison operators never match null
+    """
+    sort_by, value = after["sort_by"], after["value"]
+    descending = after["sort_order"] < 0
+    op = "$lt" if descending else "$gt"
+    same_value = {sort_by: value, "ID": {op: after["id"]}}
+    if value is None:
+        return [same_value] if descending else [same_value, {sort_by: {"$ne": None}}]
+    conditions = [{sort_by: {op: value}}, same_value]
+    return [*conditions, {sort_by: None}] if descending else conditions
 
 
 @timeit
@@ -89,47 +255,142 @@ def get_extensions(
     sort_order: int = -1,
     versions: list[str] | None = None,
     search_query: str | None = None,
+    after: PageCursor | None = None,
+    projection: dict[str, Any] | None = None,
 ) -> GetExtensionsResult:
+    """
+    Pass either offset or `after` cursor for pagination.
+    `after` is matched against the (Published, sort_by, ID) indexes, so all pages cost the same regardless of depth.
+    search_query is served from the in-memory search index, or with Mongo $text search until the index is built
+
+    :raises InvalidPageCursorError: if cursor was created for different sorting or used with search_query
+    """
     query: dict[str, Any] = {"Published": True}
 
     if versions:
         query["SupportedVersions"] = {"$in": versions}
 
+    if after and (search_query or after["sort_by"] != sort_by or after["sort_order"] != sort_order):
+        msg = "Cursor doesn't match the query. It cannot be used with different sorting or search query"
+        raise InvalidPageCursorError(msg)
+
+    if search_query and search_index.is_ready():
+        found = search_index.search(search_query, versions, sort_by, sort_order)[offset:]
+        data = found[:limit] if limit else found
+        return GetExtensionsResult(
+            data=[apply_projection(ext, projection) for ext in data],  # type: ignore
+            has_more=len(found) > len(data),
+            next_cursor=None,
+        )
+
     if search_query:
+        # the index isn't built yet
         query["$text"] = {"$search": search_query}
 
-    cursor = extension_collection.find(query)
+    if after:
+        query["$or"] = _get_after_cursor_filter(after)
+
+    # next_cursor is made of the sort field and ID. It's removed from results if it wasn't requested
+    added_sort_field = bool(projection) and sort_by not in (projection or {})
+    fields = {**(projection or {}), sort_by: 1} if added_sort_field else projection or default_projection
+    cursor = extension_collection.find(query, fields)
     if search_query:
         cursor = cursor.sort([("score", {"$meta": "textScore"}), (sort_by, sort_order)])
     else:
-        cursor = cursor.sort(sort_by, sort_order)
-    cursor = cursor.skip(offset)
+        cursor = cursor.sort([(sort_by, sort_order), ("ID", sort_order)])
+    if offset:
+        cursor = cursor.skip(offset)
 
     if limit:
         cursor = cursor.limit(limit + 1)
 
     found = list(cursor)
+    data = found[:limit] if limit else found
+    has_more = len(found) > limit if limit else False
+    next_cursor = None
+    if has_more and data and not search_query:
+        last = data[-1]
+        next_cursor = encode_page_cursor(
+            PageCursor(sort_by=sort_by, sort_order=sort_order, value=last.get(sort_by), id=last["ID"])
+        )
+    if added_sort_field:
+        for ext in data:
+            ext.pop(sort_by, None)
+
+    return GetExtensionsResult(data=data, has_more=has_more, next_cursor=next_cursor)
+
+
+@timeit
+def get_suggestions(prefix: str, limit: int = 10, versions: list[str] | None = None) -> list[Suggestion]:
+    """
+    Returns IDs and names of the most starred published extensions with names matching `prefix` word by word.
+    Uses the search index, or a regex query until the index is built
+    """
+    if search_index.is_ready():
+        return search_index.suggest(prefix, limit, versions)
+
+    terms = tokenize(prefix)
+    if not terms:
+        return []
+    query: dict[str, Any] = {
+        "Published": True,
+        "$and": [{"Name": {"$regex": rf"(^|[\W_]){re.escape(term)}", "$options": "i"}} for term in terms],
+    }
+    if versions:
+        query["SupportedVersions"] = {"$in": versions}
+    cursor = extension_collection.find(query, {"_id": 0, "ID": 1, "Name": 1})
+    return list(cursor.sort([("GithubStars", -1), ("ID", 1)]).limit(limit))
 
-    return GetExtensionsResult(
-        data=found[:limit] if limit else found,
-        has_more=len(found) > limit if limit else False,
-    )
+
+def iter_extensions(
+    query: dict[str, Any] | None = None, projection: dict[str, Any] | None = None, batch_size: int = 500
+) -> Iterator[Extension]:
+    """
+    Yields all extensions matching the query (published ones by default) ordered by ID, with `sync_projection`
+    fields by default. Extensions are fetched in batches of `batch_size`, so memory use doesn't depend on catalog size.
+    Every batch is a separate query that continues after the last ID, so there is no long-lived cursor
+    that could time out while the caller is slow (e.g. paused by GitHub rate limit)
+    """
+    query = {"Published": True} if query is None else query
+    last_id: str | None = None
+    while True:
+        batch_query = {**query, "ID": {"$gt": last_id}} if last_id is not None else query
+        batch = list(
+            extension_collection.find(batch_query, projection or sync_projection).sort("ID", 1).limit(batch_size)
+        )
+        yield from batch
+        if len(batch) < batch_size:
+            return
+        last_id = batch[-1]["ID"]
 
 
 @timeit
-def get_user_extensions(user: str, limit: int = 1000):
-    return extension_collection.find({"User": user}).sort("CreatedAt", -1).limit(limit)
+def get_user_extensions(user: str, limit: int = 1000, projection: dict[str, Any] | None = None):
+    return (
+        extension_collection.find({"User": user}, projection or default_projection).sort("CreatedAt", -1).limit(limit)
+    )
 
 
 @timeit
 def get_extension(id: str):
-    result = extension_collection.find_one({"ID": id})
+    result = extension_collection.find_one({"ID": id}, default_projection)
     if not result:
         raise ExtensionNotFoundError(f'Extension "{id}" not found')
 
     return result
 
 
+def find_extension_by_project_path(project_path: str, projection: dict[str, Any] | None = None) -> Extension | None:
+    """
+    Returns published extension of the GitHub project (case-insensitive), with `sync_projection` fields by default
+    """
+    return extension_collection.find_one(
+        {"ProjectPath": project_path, "Published": True},
+        projection or sync_projection,
+        collation=project_path_collation,
+    )
+
+
 class ExtensionAlreadyExistsError(Exception):
     pass
 
@@ -140,3 +401,7 @@ class ExtensionNotFoundError(Exception):
 
 class ExtensionDoesntBelongToUserError(Exception):
     pass
+
+
+class InvalidPageCursorError(Exception):
+    pass
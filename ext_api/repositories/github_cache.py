@@ -0,0 +1,21 @@
+import datetime
+
+from ext_api.db import github_cache_collection
+from ext_api.entities import GithubCacheEntry
+
+
+def get_cached_response(url: str) -> GithubCacheEntry | None:
+    return github_cache_collection.find_one({"Url": url}, {"_id": 0})
+
+
+def save_cached_response(url: str, body: bytes, etag: str | None, last_modified: str | None) -> None:
+    entry = GithubCacheEntry(Url=url, Body=body, UpdatedAt=datetime.datetime.now(datetime.UTC))
+    if etag:
+        entry["ETag"] = etag
+    if last_modified:
+        entry["LastModified"] = last_modified
+    github_cache_collection.replace_one({"Url": url}, entry, upsert=True)
+
+
+def delete_cached_response(url: str) -> None:
+    github_cache_collection.delete_one({"Url": url})
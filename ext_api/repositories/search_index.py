@@ -0,0 +1,316 @@
+import datetime
+import heapq
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from collections.abc import Callable, Iterator
+from typing import Any, TypedDict
+
+from ext_api.config import search_index_max_age
+from ext_api.db import default_projection, extension_collection
+from ext_api.entities import Extension
+
+logger = logging.getLogger(__name__)
+
+# a term found in a field with higher weight makes the match more relevant
+FIELD_WEIGHTS = {"Name": 4, "ProjectPath": 2, "DeveloperName": 2, "Description": 1}
+EXACT_MATCH_BONUS = 2
+REBUILD_RETRY_DELAY = 10
+# ignored unless query consists only of them
+STOP_WORDS = frozenset(["a", "an", "and", "for", "in", "of", "on", "or", "the", "to", "with"])
+TOKEN_RE = re.compile(r"[^\W_]+")
+PHRASE_RE = re.compile(r'"([^"]+)"')
+
+
+class Suggestion(TypedDict):
+    ID: str
+    Name: str
+
+
+class SearchIndexStats(TypedDict):
+    documents: int
+    terms: int
+    built_at: float | None
+    build_duration: float | None
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_RE.findall(text.casefold())
+
+
+def extension_sort_key(ext: Extension, sort_by: str) -> tuple[bool, Any, str]:
+    """
+    Same order as Mongo sort by [(sort_by, 1), ("ID", 1)]. Missing values go first.
+    Datetimes read from Mongo are naive UTC, and ones written by this process are timezone-aware
+    """
+    value = ext.get(sort_by)
+    if isinstance(value, datetime.datetime) and value.tzinfo is not None:
+        value = value.astimezone(datetime.UTC).replace(tzinfo=None)
+    return (value is not None, value, ext["ID"])
+
+
+def apply_projection(ext: Extension, projection: dict[str, Any] | None) -> dict[str, Any]:
+    """
+    Does the same as Mongo inclusion projection from build_projection() (supports $slice)
+    """
+    if not projection:
+        return dict(ext)
+
+    result: dict[str, Any] = {}
+    for field, value in ext.items():
+        spec = projection.get(field)
+        if isinstance(spec, dict) and "$slice" in spec:
+            result[field] = value[: spec["$slice"]]  # type: ignore
+        elif spec:
+            result[field] = value
+    return result
+
+
+class SearchIndex:
+    """
+    In-memory inverted index of published extensions over Name, Description, ProjectPath and DeveloperName.
+
+    Every query term matches index terms it's a prefix of, and all query terms must match.
+    Quoted phrases must also appear as is in one of the fields.
+    Results are ordered by relevance and then by the requested sort field.
+
+    Writes made by this process update the index incrementally. Changes made by other processes
+    (e.g. sync_extensions) are picked up by a background rebuild when the index gets older than `max_age` seconds.
+    The index is not used if it's older than 2 * max_age (e.g. when rebuilds keep failing)
+    """
+
+    def __init__(self, max_age: float) -> None:
+        self.max_age = max_age
+        self.built_at: float | None = None
+        self.build_duration: float | None = None
+        self._docs: dict[str, Extension] = {}
+        self._texts: dict[str, str] = {}
+        self._postings: dict[str, dict[str, int]] = {}
+        self._terms: list[str] = []
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._rebuild_scheduled = False
+        self._retry_at = 0.0
+        # writes made while a rebuild is loading extensions. They are applied again on top of the new index
+        self._replay: list[Extension | str] | None = None
+
+    def is_ready(self) -> bool:
+        """
+        Schedules a rebuild if the index hasn't been built yet or is outdated
+        """
+        built_at = self.built_at
+        age = time.time() - built_at if built_at is not None else None
+        if age is None or age >= self.max_age:
+            self.schedule_rebuild()
+        return age is not None and age < 2 * self.max_age
+
+    def is_loaded(self) -> bool:
+        """
+        Returns True if the index is built or being built, so writes must be applied to it
+        """
+        return self.built_at is not None or self._rebuild_scheduled or self._replay is not None
+
+    def schedule_rebuild(self) -> None:
+        with self._lock:
+            if self._rebuild_scheduled or time.time() < self._retry_at:
+                return
+            self._rebuild_scheduled = True
+        threading.Thread(target=self._rebuild_in_background, name="search-index", daemon=True).start()
+
+    def _rebuild_in_background(self) -> None:
+        try:
+            self._rebuild(lambda: list(extension_collection.find({"Published": True}, default_projection)))
+        except Exception:
+            logger.exception("Failed to build search index")
+            with self._lock:
+                self._retry_at = time.time() + REBUILD_RETRY_DELAY
+        finally:
+            with self._lock:
+                self._rebuild_scheduled = False
+
+    def rebuild(self, extensions: list[Extension]) -> None:
+        self._rebuild(lambda: extensions)
+
+    def _rebuild(self, load: Callable[[], list[Extension]]) -> None:
+        """
+        Writes made after the load has started are recorded and applied again on top of the loaded extensions
+        """
+        with self._rebuild_lock:
+            with self._lock:
+                self._replay = []
+            try:
+                extensions = load()
+            except BaseException:
+                with self._lock:
+                    self._replay = None
+                raise
+
+            started_at = time.perf_counter()
+            docs: dict[str, Extension] = {}
+            texts: dict[str, str] = {}
+            postings: dict[str, dict[str, int]] = {}
+            for ext in extensions:
+                docs[ext["ID"]] = ext
+                texts[ext["ID"]] = _get_text(ext)
+                for term, weight in _get_terms(ext):
+                    postings.setdefault(term, {})[ext["ID"]] = weight
+
+            with self._lock:
+                self._docs = docs
+                self._texts = texts
+                self._postings = postings
+                self._terms = sorted(postings)
+                self.built_at = time.time()
+                self.build_duration = time.perf_counter() - started_at
+                replay, self._replay = self._replay, None
+                for change in replay or []:
+                    if isinstance(change, str):
+                        self._remove(change)
+                    else:
+                        self._upsert(change)
+            logger.info("Built search index of %s extensions in %.3f sec", len(docs), self.build_duration)
+
+    def upsert(self, ext: Extension) -> None:
+        """
+        Adds, updates or removes (if not published) the extension. Does nothing if the index isn't built yet
+        """
+        with self._lock:
+            ext = ext.copy()
+            if self._replay is not None:
+                self._replay.append(ext)
+            if self.built_at is not None:
+                self._upsert(ext)
+
+    def remove(self, id: str) -> None:
+        with self._lock:
+            if self._replay is not None:
+                self._replay.append(id)
+            self._remove(id)
+
+    def _upsert(self, ext: Extension) -> None:
+        self._remove(ext["ID"])
+        if not ext.get("Published"):
+            return
+        self._docs[ext["ID"]] = ext
+        self._texts[ext["ID"]] = _get_text(ext)
+        for term, weight in _get_terms(ext):
+            if term not in self._postings:
+                self._postings[term] = {}
+                insort(self._terms, term)
+            self._postings[term][ext["ID"]] = weight
+
+    def _remove(self, id: str) -> None:
+        ext = self._docs.pop(id, None)
+        self._texts.pop(id, None)
+        if not ext:
+            return
+        for term, _ in _get_terms(ext):
+            docs = self._postings.get(term)
+            if docs is None:
+                continue
+            docs.pop(id, None)
+            if not docs:
+                del self._postings[term]
+                del self._terms[bisect_left(self._terms, term)]
+
+    def search(
+        self, query: str, versions: list[str] | None = None, sort_by: str = "GithubStars", sort_order: int = -1
+    ) -> list[Extension]:
+        phrases = [p.casefold().strip() for p in PHRASE_RE.findall(query) if p.strip()]
+        terms = list(dict.fromkeys(tokenize(query)))
+        terms = [t for t in terms if t not in STOP_WORDS] or terms
+        if not terms:
+            return []
+
+        with self._lock:
+            scores: dict[str, int] = {}
+            for i, term in enumerate(terms):
+                term_scores: dict[str, int] = {}
+                for index_term in self._iter_prefixed(term):
+                    bonus = EXACT_MATCH_BONUS if index_term == term else 1
+                    for id, weight in self._postings[index_term].items():
+                        term_scores[id] = max(term_scores.get(id, 0), weight * bonus)
+                if i == 0:
+                    scores = term_scores
+                else:
+                    scores = {id: score + term_scores[id] for id, score in scores.items() if id in term_scores}
+                if not scores:
+                    return []
+
+            found = [
+                self._docs[id]
+                for id in scores
+                if all(phrase in self._texts[id] for phrase in phrases)
+                and (not versions or any(v in self._docs[id]["SupportedVersions"] for v in versions))
+            ]
+
+        # sort is stable, so the second sort keeps the order of the first one for equal scores
+        found.sort(key=lambda ext: extension_sort_key(ext, sort_by), reverse=sort_order < 0)
+        found.sort(key=lambda ext: scores[ext["ID"]], reverse=True)
+        return found
+
+    def suggest(self, prefix: str, limit: int = 10, versions: list[str] | None = None) -> list[Suggestion]:
+        """
+        Returns the most starred extensions with every word of `prefix` being a prefix of a word in their names
+        """
+        terms = list(dict.fromkeys(tokenize(prefix)))
+        if not terms:
+            return []
+
+        with self._lock:
+            ids: set[str] | None = None
+            for term in terms:
+                # terms are stored with the highest weight of the fields they were found in, and Name has the highest
+                matched = {
+                    id
+                    for index_term in self._iter_prefixed(term)
+                    for id, weight in self._postings[index_term].items()
+                    if weight == FIELD_WEIGHTS["Name"]
+                }
+                ids = matched if ids is None else ids & matched
+                if not ids:
+                    return []
+
+            found = (
+                self._docs[id]
+                for id in ids or ()
+                if not versions or any(v in self._docs[id]["SupportedVersions"] for v in versions)
+            )
+            top = heapq.nsmallest(limit, found, key=lambda ext: (-(ext.get("GithubStars") or 0), ext["ID"]))
+
+        return [Suggestion(ID=ext["ID"], Name=ext["Name"]) for ext in top]
+
+    def _iter_prefixed(self, prefix: str) -> Iterator[str]:
+        i = bisect_left(self._terms, prefix)
+        while i < len(self._terms) and self._terms[i].startswith(prefix):
+            yield self._terms[i]
+            i += 1
+
+    def stats(self) -> SearchIndexStats:
+        with self._lock:
+            return SearchIndexStats(
+                documents=len(self._docs),
+                terms=len(self._terms),
+                built_at=self.built_at,
+                build_duration=self.build_duration,
+            )
+
+
+def _get_terms(ext: Extension) -> Iterator[tuple[str, int]]:
+    """
+    Yields unique terms of the extension with the highest weight of fields they were found in
+    """
+    weights: dict[str, int] = {}
+    for field, weight in FIELD_WEIGHTS.items():
+        for term in tokenize(str(ext.get(field) or "")):
+            weights[term] = max(weights.get(term, 0), weight)
+    yield from weights.items()
+
+
+def _get_text(ext: Extension) -> str:
+    return "\n".join(str(ext.get(field) or "") for field in FIELD_WEIGHTS).casefold()
+
+
+search_index = SearchIndex(max_age=search_index_max_age)
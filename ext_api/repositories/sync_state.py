@@ -0,0 +1,87 @@
+import datetime
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from ext_api.db import sync_state_collection
+from ext_api.entities import SyncState
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.UTC)
+
+
+def acquire_lease(key: str, owner: str, ttl: float) -> bool:
+    """
+    Returns False if the lease is held by another owner and hasn't expired yet
+    """
+    now = _now()
+    try:
+        sync_state_collection.update_one(
+            {"Key": key, "$or": [{"Owner": None}, {"Owner": owner}, {"LeaseExpiresAt": {"$lte": now}}]},
+            {"$set": {"Owner": owner, "LeaseExpiresAt": now + datetime.timedelta(seconds=ttl)}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        # the document exists, but didn't match the query
+        return False
+    return True
+
+
+def renew_lease(key: str, owner: str, ttl: float) -> bool:
+    """
+    Returns False if the lease has been taken over by another owner
+    """
+    result = sync_state_collection.update_one(
+        {"Key": key, "Owner": owner},
+        {"$set": {"LeaseExpiresAt": _now() + datetime.timedelta(seconds=ttl)}},
+    )
+    return result.matched_count == 1
+
+
+def release_lease(key: str, owner: str) -> None:
+    sync_state_collection.update_one({"Key": key, "Owner": owner}, {"$unset": {"Owner": "", "LeaseExpiresAt": ""}})
+
+
+def start_sync_run(key: str) -> tuple[datetime.datetime, bool]:
+    """
+    Returns start time of the run and whether it resumes the previous run that was interrupted
+    """
+    state = sync_state_collection.find_one({"Key": key}, {"_id": 0}) or SyncState(Key=key)
+    started_at = state.get("RunStartedAt")
+    if started_at and not state.get("RunFinishedAt"):
+        return started_at, True
+
+    started_at = _now()
+    sync_state_collection.update_one(
+        {"Key": key}, {"$set": {"RunStartedAt": started_at}, "$unset": {"RunFinishedAt": ""}}, upsert=True
+    )
+    return started_at, False
+
+
+def finish_sync_run(key: str) -> None:
+    sync_state_collection.update_one({"Key": key}, {"$set": {"RunFinishedAt": _now()}})
+
+
+def is_sync_run_finished(key: str, since: datetime.datetime) -> bool:
+    return sync_state_collection.count_documents({"Key": key, "RunFinishedAt": {"$gte": since}}, limit=1) > 0
+
+
+def save_checkpoints(ids: list[str]) -> None:
+    if not ids:
+        return
+    synced_at = _now()
+    sync_state_collection.bulk_write(  # type: ignore
+        [UpdateOne({"Key": f"ext:{id}"}, {"$set": {"SyncedAt": synced_at}}, upsert=True) for id in ids],
+        ordered=False,
+    )
+
+
+def get_checkpointed_ids(since: datetime.datetime) -> set[str]:
+    """
+    Returns IDs of extensions synced after `since`
+    """
+    return {
+        state["Key"].removeprefix("ext:")
+        for state in sync_state_collection.find({"SyncedAt": {"$gte": since}}, {"_id": 0, "Key": 1})
+    }
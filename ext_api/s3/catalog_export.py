@@ -0,0 +1,106 @@
+import base64
+import hashlib
+import json
+import logging
+from typing import TypedDict
+
+from ext_api.config import (
+    catalog_bucket_name,
+    catalog_export_delay,
+    catalog_export_max_age,
+    catalog_export_prefix,
+)
+from ext_api.db import extension_collection
+from ext_api.helpers.debounce import Debouncer
+from ext_api.repositories.catalog_snapshots import SNAPSHOT_LIMIT, SNAPSHOT_SORT_BY, iter_catalog_pages
+from ext_api.repositories.extensions import default_projection
+from ext_api.s3.ext_images import s3
+
+logger = logging.getLogger(__name__)
+catalog_bucket = s3.Bucket(catalog_bucket_name)  # type: ignore
+_debouncer = Debouncer(delay=catalog_export_delay)
+MAX_KEYS_PER_DELETE = 1000
+
+
+class ExportResult(TypedDict):
+    uploaded: int
+    unchanged: int
+    deleted: int
+
+
+def get_page_key(sort_by: str, sort_order: int, version: str | None, offset: int) -> str:
+    """
+    >>> get_page_key("GithubStars", -1, "2", 1000)
+    <<< 'catalog/2/GithubStars/desc/1.json'
+    """
+    order = "desc" if sort_order < 0 else "asc"
+    return f"{catalog_export_prefix}/{version or 'all'}/{sort_by}/{order}/{offset // SNAPSHOT_LIMIT}.json"
+
+
+def export_catalog() -> ExportResult:
+    """
+    Uploads pre-rendered GET /extensions pages for every API version and sort order, plus index.json
+    that lists them with their sha256 hashes.
+    Pages with the same content as already uploaded ones (compared by MD5 ETag) are skipped,
+    pages that are no longer produced are deleted
+    """
+    extensions = list(extension_collection.find({"Published": True}, default_projection))
+    existing: dict[str, str] = {
+        obj.key: obj.e_tag.strip('"')  # type: ignore
+        for obj in catalog_bucket.objects.filter(Prefix=f"{catalog_export_prefix}/")  # type: ignore
+    }
+    result = ExportResult(uploaded=0, unchanged=0, deleted=0)
+    hashes: dict[str, str] = {}
+
+    def upload(key: str, body: bytes) -> None:
+        md5 = hashlib.md5(body, usedforsecurity=False)
+        if existing.get(key) == md5.hexdigest():
+            result["unchanged"] += 1
+            return
+        catalog_bucket.put_object(  # type: ignore
+            Key=key,
+            Body=body,
+            ACL="public-read",
+            ContentType="application/json",
+            CacheControl=f"public, max-age={catalog_export_max_age}",
+            ContentMD5=base64.b64encode(md5.digest()).decode(),
+            Metadata={"sha256": hashlib.sha256(body).hexdigest()},
+        )
+        result["uploaded"] += 1
+
+    for page in iter_catalog_pages(extensions):
+        key = get_page_key(page["sort_by"], page["sort_order"], page["version"], page["offset"])
+        hashes[key] = hashlib.sha256(page["body"]).hexdigest()
+        upload(key, page["body"])
+
+    index = {
+        "versions": sorted({v for ext in extensions for v in ext["SupportedVersions"]}),
+        "sort_by": SNAPSHOT_SORT_BY,
+        "page_size": SNAPSHOT_LIMIT,
+        "pages": hashes,
+    }
+    index_key = f"{catalog_export_prefix}/index.json"
+    upload(index_key, json.dumps(index, sort_keys=True).encode())
+
+    stale = [key for key in existing if key not in hashes and key != index_key]
+    for i in range(0, len(stale), MAX_KEYS_PER_DELETE):
+        batch = stale[i : i + MAX_KEYS_PER_DELETE]
+        catalog_bucket.delete_objects(Delete={"Objects": [{"Key": key} for key in batch]})  # type: ignore
+        result["deleted"] += len(batch)
+
+    logger.info(
+        "Exported catalog to s3://%s/%s/: %s uploaded, %s unchanged, %s deleted",
+        catalog_bucket_name,
+        catalog_export_prefix,
+        result["uploaded"],
+        result["unchanged"],
+        result["deleted"],
+    )
+    return result
+
+
+def schedule_catalog_export() -> None:
+    """
+    Exports catalog in a background thread. Bursts of writes result in a single export
+    """
+    _debouncer.call("export_catalog", export_catalog)
@@ -4,40 +4,60 @@ import logging
 import os
 from itertools import cycle
 from typing import Any
-from urllib.error import HTTPError
+from urllib.error import HTTPError, URLError
 
 from bottle import Bottle, FileUpload, JSONPlugin, request, response, template  # type: ignore
-from bson.json_util import dumps
 
-from ext_api.config import commit, github_api_token, github_api_user, max_images_per_uer
+from ext_api.config import (
+    cache_stats_users,
+    catalog_export_enabled,
+    commit,
+    extension_cache_size,
+    extensions_cache_size,
+    extensions_cache_ttl,
+    github_api_credentials,
+    max_images_per_uer,
+    suggest_cache_size,
+)
 from ext_api.db import check_migration_consistency
 from ext_api.entities import Extension
 from ext_api.github import (
     InvalidGithubUrlError,
     JsonFileNotFoundError,
     ProjectValidationError,
-    get_manifest,
+    get_manifest_and_versions,
     get_project_path,
-    get_repo_info,
-    get_versions,
+    get_repo_info_cached,
+    validation_cache,
 )
-from ext_api.helpers.auth import AuthError, bottle_auth_plugin, jwt_auth_required
+from ext_api.github_webhooks import InvalidSignatureError, handle_event, verify_signature
+from ext_api.helpers.auth import AuthError, bottle_auth_plugin, jwt_auth_required, signing_keys, verified_tokens
 from ext_api.helpers.aws import get_url_prefix
+from ext_api.helpers.cache import LRUCache
+from ext_api.helpers.compression import compress_response
 from ext_api.helpers.cors import add_options_route, allow_options_requests
-from ext_api.helpers.http_client import http
+from ext_api.helpers.json_encoder import dumps, dumps_bytes
 from ext_api.helpers.logging_utils import bottle_request_logger
-from ext_api.helpers.response import ErrorResponse
+from ext_api.helpers.response import EncodedResponse, ErrorResponse, send_encoded
+from ext_api.repositories.catalog_snapshots import SNAPSHOT_LIMIT, catalog_snapshots
 from ext_api.repositories.extensions import (
     ExtensionAlreadyExistsError,
     ExtensionDoesntBelongToUserError,
     ExtensionNotFoundError,
+    InvalidPageCursorError,
+    build_projection,
+    decode_page_cursor,
     delete_extension,
     get_extension,
     get_extensions,
+    get_suggestions,
     get_user_extensions,
+    on_extension_change,
     put_extension,
     update_extension,
 )
+from ext_api.repositories.search_index import search_index, tokenize
+from ext_api.s3.catalog_export import schedule_catalog_export
 from ext_api.s3.ext_images import (
     FileTooLargeError,
     ImageUrlValidationError,
@@ -46,8 +66,10 @@ from ext_api.s3.ext_images import (
     upload_images,
     validate_image_url,
 )
+from ext_api.ulauncher_releases import ulauncher_releases
 
 app = Bottle(autojson=False)
+app.install(compress_response)  # type: ignore
 app.install(JSONPlugin(json_dumps=dumps))  # type: ignore
 app.install(allow_options_requests)  # type: ignore
 app.install(bottle_auth_plugin)  # type: ignore
@@ -60,8 +82,29 @@ response.content_type = "application/json"
 
 allowed_sort_by = ["GithubStars", "CreatedAt"]
 allowed_sort_order = ["-1", "1"]
-HTTP_STATUS_OK = 200
 MAX_LIMIT = 1000
+MAX_SUGGEST_LIMIT = 50
+
+# encoded GET /extensions responses keyed by normalized query params
+extensions_cache: LRUCache[tuple[Any, ...], EncodedResponse] = LRUCache(
+    maxsize=extensions_cache_size, ttl=extensions_cache_ttl
+)
+# encoded GET /extensions/<id> responses keyed by extension ID
+extension_cache: LRUCache[str, EncodedResponse] = LRUCache(maxsize=extension_cache_size, ttl=extensions_cache_ttl)
+# encoded GET /extensions/suggest responses keyed by normalized query params
+suggest_cache: LRUCache[tuple[Any, ...], EncodedResponse] = LRUCache(
+    maxsize=suggest_cache_size, ttl=extensions_cache_ttl
+)
+
+
+def _invalidate_caches(ids: list[str]) -> None:
+    extensions_cache.clear()
+    for id in ids:
+        extension_cache.delete(id)
+    suggest_cache.clear()
+    catalog_snapshots.invalidate()
+    if catalog_export_enabled:
+        schedule_catalog_export()
 
 
 @app.route("/api-doc.html", method=["GET"])  # type: ignore
@@ -73,7 +116,7 @@ def api_doc() -> str:
 
 
 @app.route("/extensions", ["GET"])  # type: ignore
-def get_extensions_route() -> dict[str, Any]:
+def get_extensions_route() -> bytes:
     """
     Returns all extensions
 
@@ -83,10 +126,17 @@ def get_extensions_route() -> dict[str, Any]:
       Could be comma-separated list of versions.
       Returns all extensions if not specified.
     * offset: int. Offset for pagination (default: 0)
+    * cursor: string. Opaque cursor for pagination. Pass `next_cursor` from the previous page
+      to get the next one. Cannot be combined with offset or q
     * limit: int. Limit for pagination (default: 1000)
+    * fields: string. Comma-separated list of fields to return. ID is always returned.
+      "card" preset returns ID, Name, Description, first image, GithubStars and SupportedVersions.
+      Returns all fields if not specified.
+
+    Responses have an ETag header. Requests with a matching If-None-Match header get an empty 304 response
     """
     versions_query = request.GET.get("versions")
-    versions: list[str] = versions_query.split(",") if versions_query else []
+    versions: list[str] = sorted(set(versions_query.split(","))) if versions_query else []
     try:
         q = request.GET.get("q")
         search_query = q.strip() if q is not None else None
@@ -98,23 +148,83 @@ def get_extensions_route() -> dict[str, Any]:
         assert sort_order in allowed_sort_order, "allowed sort_order: " + ", ".join(map(str, allowed_sort_order))
         offset = int(request.GET.get("offset") or 0)
         limit = int(request.GET.get("limit") or MAX_LIMIT)
+        cursor = request.GET.get("cursor") or None
         assert offset >= 0, "offset must be >= 0"
         assert 1 <= limit <= MAX_LIMIT, f"limit must be between 1 and {MAX_LIMIT}"
+        assert not (cursor and offset), "cursor cannot be combined with offset"
+        assert not (cursor and search_query), "cursor cannot be combined with q"
+        for v in versions:
+            assert v.isdigit(), "versions must be a comma-separated list of numbers"
+        fields = _get_fields_param()
+        projection = build_projection(fields) if fields else None
+    except (AssertionError, ValueError) as e:
+        return ErrorResponse(e, 400)  # type: ignore
+
+    if not search_query and not offset and not cursor and not fields and limit == SNAPSHOT_LIMIT and len(versions) <= 1:
+        snapshot = catalog_snapshots.get(sort_by, int(sort_order), versions[0] if versions else None)
+        if snapshot:
+            return send_encoded(snapshot.response)
+
+    cache_key = (tuple(versions), sort_by, sort_order, offset, limit, search_query, cursor, tuple(fields))
+    generation = extensions_cache.generation
+    encoded = extensions_cache.get(cache_key)
+    if encoded is None:
+        try:
+            result = get_extensions(
+                offset=offset,
+                limit=limit,
+                sort_by=sort_by,
+                sort_order=int(sort_order),
+                versions=versions,
+                search_query=search_query,
+                after=decode_page_cursor(cursor) if cursor else None,
+                projection=projection,
+            )
+        except InvalidPageCursorError as e:
+            return ErrorResponse(e, 400)  # type: ignore
+        body = {
+            "data": result["data"],
+            "offset": offset,
+            "has_more": result["has_more"],
+            "next_cursor": result["next_cursor"],
+        }
+        encoded = EncodedResponse(dumps_bytes(body))
+        extensions_cache.set(cache_key, encoded, generation=generation)
+
+    return send_encoded(encoded)
+
+
+@app.route("/extensions/suggest", ["GET"])  # type: ignore
+def get_suggestions_route() -> bytes:
+    """
+    Returns IDs and names of the most starred extensions for search-as-you-type
+
+    Query params:
+    * prefix: string. Every word must be a beginning of a word in the extension name
+    * versions: string. Comma-separated list of versions of Ulauncher Extension API
+    * limit: int. Max number of suggestions (default: 10)
+    """
+    versions_query = request.GET.get("versions")
+    versions: list[str] = sorted(set(versions_query.split(","))) if versions_query else []
+    try:
+        terms = tokenize(request.GET.get("prefix") or "")
+        assert terms, 'query argument "prefix" must contain letters or digits'
+        limit = int(request.GET.get("limit") or 10)
+        assert 1 <= limit <= MAX_SUGGEST_LIMIT, f"limit must be between 1 and {MAX_SUGGEST_LIMIT}"
         for v in versions:
             assert v.isdigit(), "versions must be a comma-separated list of numbers"
     except (AssertionError, ValueError) as e:
         return ErrorResponse(e, 400)  # type: ignore
 
-    result = get_extensions(
-        offset=offset,
-        limit=limit,
-        sort_by=sort_by,
-        sort_order=int(sort_order),
-        versions=versions,
-        search_query=search_query,
-    )
+    prefix = " ".join(terms)
+    cache_key = (prefix, tuple(versions), limit)
+    generation = suggest_cache.generation
+    encoded = suggest_cache.get(cache_key)
+    if encoded is None:
+        encoded = EncodedResponse(dumps_bytes({"data": get_suggestions(prefix, limit, versions)}))
+        suggest_cache.set(cache_key, encoded, generation=generation)
 
-    return {"data": result["data"], "offset": offset, "has_more": result["has_more"]}
+    return send_encoded(encoded)
 
 
 @app.route("/my/extensions", ["GET"])  # type: ignore
@@ -122,20 +232,36 @@ def get_extensions_route() -> dict[str, Any]:
 def get_my_extensions_route():
     """
     Returns user's extensions
+
+    Query params:
+    * fields: string. Comma-separated list of fields or "card" preset (see GET /extensions)
     """
     user = request.get("REMOTE_USER")
-    return {"data": get_user_extensions(user)}
+    try:
+        fields = _get_fields_param()
+        projection = build_projection(fields) if fields else None
+    except AssertionError as e:
+        return ErrorResponse(e, 400)
+    return {"data": get_user_extensions(user, projection=projection)}
 
 
 @app.route("/extensions/<id>", ["GET"])  # type: ignore
-def get_extension_route(id: str) -> dict[str, Any]:
+def get_extension_route(id: str) -> bytes:
     """
     Returns extension by ID
+
+    Responses have an ETag header. Requests with a matching If-None-Match header get an empty 304 response
     """
-    try:
-        return {"data": get_extension(id)}
-    except ExtensionNotFoundError as e:
-        return ErrorResponse(e, 404)  # type: ignore
+    generation = extension_cache.generation
+    encoded = extension_cache.get(id)
+    if encoded is None:
+        try:
+            encoded = EncodedResponse(dumps_bytes({"data": get_extension(id)}))
+        except ExtensionNotFoundError as e:
+            return ErrorResponse(e, 404)  # type: ignore
+        extension_cache.set(id, encoded, generation=generation)
+
+    return send_encoded(encoded)
 
 
 @app.route("/validate-project", ["GET"])  # type: ignore
@@ -155,14 +281,15 @@ def validate_project():
         url = request.GET.get("url")
         assert url, 'query argument "url" cannot be empty'
         project_path = get_project_path(url)
-        repo_info = get_repo_info(project_path)
+        repo_info = get_repo_info_cached(project_path)
+        manifest_result, versions_result = get_manifest_and_versions(project_path, repo_info, cached=True)
 
-        # get manifest.json and validate it
-        manifest = get_manifest(project_path, repo_info)
+        # validate manifest.json
+        manifest = manifest_result.result()
 
-        # get versions.json and validate it
+        # validate versions.json
         try:
-            get_versions(project_path, repo_info)
+            versions_result.result()
         except JsonFileNotFoundError:
             pass  # versions.json file is optional
         except json.JSONDecodeError as e:
@@ -213,15 +340,16 @@ def create_extension_route():
         )
 
         project_path = get_project_path(data["GithubUrl"])
-        repo_info = get_repo_info(project_path)
+        repo_info = get_repo_info_cached(project_path)
+        manifest_result, versions_result = get_manifest_and_versions(project_path, repo_info, cached=True)
 
-        # get manifest.json and validate it
-        manifest = get_manifest(project_path, repo_info)
+        # validate manifest.json
+        manifest = manifest_result.result()
 
-        # get versions.json and validate it
+        # validate versions.json
         versions_only: list[str] = []
         try:
-            versions = get_versions(project_path, repo_info)
+            versions = versions_result.result()
             versions_only = [v["api_version"] for v in versions["versions"]]
         except JsonFileNotFoundError:
             versions_only = [manifest["api_version"]]
@@ -327,6 +455,33 @@ def delete_extension_route(id: str):
         return ErrorResponse(e, 401)
 
 
+@app.route("/webhooks/github", ["POST"])  # type: ignore
+def github_webhook_route():
+    """
+    Receives GitHub push and star events and resyncs the extension of the repository
+
+    Request must be signed with $GITHUB_WEBHOOK_SECRET (X-Hub-Signature-256 header)
+    and have "application/json" content type
+
+    Response:
+    * 202 if resync of the extension is scheduled, 204 if the event is ignored
+    """
+    body: bytes = request.body.read()  # type: ignore
+    try:
+        verify_signature(body, request.get_header("X-Hub-Signature-256"))
+    except InvalidSignatureError as e:
+        logger.warning("Rejected GitHub webhook: %s", e)
+        return ErrorResponse(e, 403)
+    try:
+        payload = json.loads(body)
+        assert isinstance(payload, dict), "Payload must be a JSON object"
+    except (ValueError, AssertionError) as e:
+        return ErrorResponse(e, 400)
+
+    response.status = 202 if handle_event(request.get_header("X-GitHub-Event", ""), payload) else 204  # type: ignore
+    return None
+
+
 @app.route("/upload-images.html", ["GET"])  # type: ignore
 def upload_images_html_route() -> str:
     """
@@ -372,20 +527,53 @@ def upload_images_route():
 @app.route("/misc/ulauncher-releases/<version>", ["GET"])  # type: ignore
 def get_ulauncher_release(version: str):
     """
-    Fetches Ulauncher release from Github by given git tag (version)
+    Returns Ulauncher release from Github by given git tag (version)
 
     Note: This is necessary because Github API limits number of unauthenticated requests and it often blocks
     IPs that Travis CI uses, so Ulauncher releases could fail
     """
-    headers = {"User-Agent": "curl/7.47.0"}
-    resp = http.request("GET", "https://api.github.com/repos/ulauncher/ulauncher/releases", headers=headers)
-    if resp.status != HTTP_STATUS_OK:
-        return ErrorResponse(Exception(f"Could not get releases from Github. {resp.data}"), 400)
-    releases = json.loads(resp.data)
     try:
-        return next(r for r in releases if r["tag_name"] == version)
-    except StopIteration:
+        release = ulauncher_releases.get(version)
+    except (HTTPError, URLError) as e:
+        return ErrorResponse(Exception(f"Could not get releases from Github. {e}"), 400)
+    if not release:
         return ErrorResponse(Exception(f"Release version {version} not found"), 404)
+    return release
+
+
+@app.route("/misc/cache-stats", ["GET"])  # type: ignore
+@jwt_auth_required
+def get_cache_stats():
+    """
+    Only users listed in $CACHE_STATS_USERS have access.
+
+    Returns size and hit/miss counters of in-memory response caches, catalog snapshot sizes and build time,
+    search index size, project validation cache counters, the number of indexed Ulauncher releases,
+    verified auth token cache counters and the number of Auth0 signing keys
+    """
+    if request.get("REMOTE_USER") not in cache_stats_users:
+        return ErrorResponse(Exception("You are not allowed to see cache stats"), 403)
+    return {
+        "data": {
+            "extensions": extensions_cache.stats(),
+            "extension": extension_cache.stats(),
+            "suggest": suggest_cache.stats(),
+            "snapshots": catalog_snapshots.stats(),
+            "search_index": search_index.stats(),
+            "project_validation": validation_cache.stats(),
+            "ulauncher_releases": ulauncher_releases.stats(),
+            "auth_tokens": verified_tokens.stats(),
+            "auth0_keys": signing_keys.stats(),
+        }
+    }
+
+
+def _get_fields_param() -> list[str]:
+    """
+    Returns sorted unique names from "fields" query param
+    """
+    fields_query = request.GET.get("fields")
+    return sorted({f.strip() for f in fields_query.split(",") if f.strip()}) if fields_query else []
 
 
 def _verify_ext_auth(id: str) -> Extension:
@@ -415,12 +603,15 @@ class MaxImageLimitError(Exception):
 def http_server():
     check_migration_consistency()
     port = os.getenv("PORT") or 8080
-    if not github_api_token or not github_api_user:
+    if not github_api_credentials:
         logger.warning(
-            "GITHUB_API_USER and GITHUB_API_TOKEN env vars are not set. "
+            "GITHUB_API_USER and GITHUB_API_TOKEN (or GITHUB_API_TOKENS) env vars are not set. "
             "For unauthenticated requests, the rate limit allows for up to 60 requests per hour "
             "(see https://developer.github.com/v3/#rate-limiting)"
         )
+    # only the serving process keeps these caches. CLI commands (e.g. sync_extensions) import this module too
+    on_extension_change(_invalidate_caches)
+    signing_keys.start()
     threads = os.getenv("GUNICORN_THREADS")
     if threads:
         app.run(server="gunicorn", host="0.0.0.0", port=port, threads=int(threads), debug=False)  # type: ignore
@@ -0,0 +1,226 @@
+import heapq
+import logging
+import math
+import threading
+import time
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypedDict
+
+from ext_api.config import (
+    catalog_export_enabled,
+    sync_concurrency,
+    sync_daemon_base_interval,
+    sync_daemon_max_interval,
+    sync_daemon_min_interval,
+    sync_daemon_rate_budget,
+    sync_daemon_reload_interval,
+    sync_lease_ttl,
+)
+from ext_api.entities import Extension
+from ext_api.github import GRAPHQL_BATCH_SIZE, token_pool
+from ext_api.repositories.extensions import iter_extensions
+from ext_api.s3.catalog_export import schedule_catalog_export
+from ext_api.sync_extensions import (
+    WRITE_BATCH_SIZE,
+    PendingUpdates,
+    ShardLease,
+    get_batch_repos_info,
+    sync_extension,
+)
+
+logger = logging.getLogger(__name__)
+# limit of a token until the first GitHub response tells the actual limit
+DEFAULT_RATE_LIMIT = 5000
+# the daemon wakes up at least this often to check if it's been stopped
+MAX_SLEEP = 60
+
+
+class ScheduleEntry(TypedDict):
+    ext: Extension
+    due_at: float
+    # number of syncs in a row that didn't change anything
+    unchanged: int
+
+
+class SyncSchedule:
+    """
+    Priority queue of extensions keyed by the time their next sync is due.
+
+    The base interval gets shorter the more stars the repo has (down to `min_interval`),
+    and is doubled for every sync in a row that didn't change the extension (up to `max_interval`)
+    """
+
+    def __init__(self, base_interval: float, min_interval: float, max_interval: float) -> None:
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._entries: dict[str, ScheduleEntry] = {}
+        # may contain outdated items. An item is valid only if its due time is the same as in the entry
+        self._heap: list[tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_interval(self, entry: ScheduleEntry) -> float:
+        stars = max(entry["ext"].get("GithubStars") or 0, 0)
+        base = max(self.base_interval / (1 + math.log2(1 + stars)), self.min_interval)
+        return min(base * 2 ** min(entry["unchanged"], 32), self.max_interval)
+
+    def load(self, extensions: Iterable[Extension], now: float) -> None:
+        """
+        Adds new extensions (due now), updates data of known ones and removes ones that are missing
+        """
+        entries: dict[str, ScheduleEntry] = {}
+        for ext in extensions:
+            entry = self._entries.get(ext["ID"])
+            if entry:
+                entry["ext"] = ext
+            else:
+                entry = ScheduleEntry(ext=ext, due_at=now, unchanged=0)
+                self._heap.append((now, ext["ID"]))
+            entries[ext["ID"]] = entry
+        self._entries = entries
+        # drops items of removed extensions
+        self._heap = [(due_at, id) for due_at, id in self._heap if id in entries]
+        heapq.heapify(self._heap)
+
+    def pop_due(self, now: float, limit: int) -> list[Extension]:
+        """
+        Returns up to `limit` extensions that are due, most overdue first. They stay unscheduled until reschedule()
+        """
+        due: list[Extension] = []
+        while self._heap and len(due) < limit and self._heap[0][0] <= now:
+            due_at, id = heapq.heappop(self._heap)
+            entry = self._entries.get(id)
+            if entry and entry["due_at"] == due_at:
+                due.append(entry["ext"])
+        return due
+
+    def reschedule(self, id: str, changed: bool, now: float) -> None:
+        entry = self._entries.get(id)
+        if not entry:
+            return
+        entry["unchanged"] = 0 if changed else entry["unchanged"] + 1
+        entry["due_at"] = now + self.get_interval(entry)
+        heapq.heappush(self._heap, (entry["due_at"], id))
+
+    def next_due_at(self) -> float | None:
+        while self._heap:
+            due_at, id = self._heap[0]
+            entry = self._entries.get(id)
+            if entry and entry["due_at"] == due_at:
+                return due_at
+            heapq.heappop(self._heap)
+        return None
+
+
+class SyncDaemon:
+    """
+    Keeps syncing extensions when they are due according to SyncSchedule.
+    Due extensions are synced in batches of up to GRAPHQL_BATCH_SIZE, and the daemon sleeps after every batch
+    so it uses about `rate_budget` (fraction) of GitHub API rate limit
+    """
+
+    def __init__(self, schedule: SyncSchedule, concurrency: int, rate_budget: float) -> None:
+        self.schedule = schedule
+        self.concurrency = concurrency
+        self.rate_budget = rate_budget
+        self.stopped = threading.Event()
+        self._loaded_at = 0.0
+        # the previous batch has used the budget until this time
+        self._next_batch_at = 0.0
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+    def get_request_interval(self) -> float:
+        """
+        Returns seconds between GitHub API requests that keep the daemon within its share of the rate limit
+        """
+        limit = token_pool.limit or DEFAULT_RATE_LIMIT * len(token_pool.limiters)
+        return 3600 / (limit * self.rate_budget)
+
+    def run_once(self, executor: ThreadPoolExecutor) -> float:
+        """
+        Syncs one batch of due extensions. Returns the number of seconds to sleep before the next batch
+        """
+        now = time.time()
+        if now < self._next_batch_at:
+            return min(self._next_batch_at - now, MAX_SLEEP)
+        if now - self._loaded_at >= sync_daemon_reload_interval:
+            self.schedule.load(iter_extensions(), now)
+            self._loaded_at = now
+            logger.info("Loaded %s extensions to the sync schedule", len(self.schedule))
+
+        batch = self.schedule.pop_due(now, GRAPHQL_BATCH_SIZE)
+        if batch:
+            repos_info = get_batch_repos_info(batch)
+            # one GraphQL request for the batch, and a REST request for each repo missing from its response
+            spent = (1 if repos_info else 0) + len(batch) - len(repos_info)
+            self._next_batch_at = now + spent * self.get_request_interval()
+            pending_updates = PendingUpdates(batch_size=WRITE_BATCH_SIZE)
+
+            def sync(ext: Extension) -> bool:
+                """
+                Returns True if the extension has changed
+                """
+                try:
+                    _, changes = sync_extension(ext, repos_info.get(ext["ProjectPath"]))
+                except Exception:
+                    logger.exception("Failed to sync extension %s", ext["ProjectPath"])
+                    return False
+                pending_updates.add(ext["ID"], changes)
+                # next sync compares new data with these values
+                ext.update(changes)  # type: ignore
+                return bool(changes)
+
+            for ext, changed in zip(batch, executor.map(sync, batch), strict=True):
+                self.schedule.reschedule(ext["ID"], changed=changed, now=time.time())
+            pending_updates.flush()
+            logger.info("Synced %s due extensions. Modified %s documents", len(batch), pending_updates.modified)
+            if pending_updates.modified and catalog_export_enabled:
+                schedule_catalog_export()
+
+        next_due_at = self.schedule.next_due_at()
+        next_batch_at = max(next_due_at if next_due_at is not None else math.inf, self._next_batch_at)
+        return min(max(next_batch_at - time.time(), 0), MAX_SLEEP)
+
+    def run(self) -> None:
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="sync") as executor:
+            while not self.stopped.is_set():
+                try:
+                    delay = self.run_once(executor)
+                except Exception:
+                    logger.exception("Sync daemon iteration failed")
+                    delay = MAX_SLEEP
+                self.stopped.wait(delay)
+
+
+def sync_daemon(concurrency: int = sync_concurrency, rate_budget: float = sync_daemon_rate_budget) -> None:
+    """
+    Runs SyncDaemon until interrupted. Only one daemon can run at a time
+    """
+    schedule = SyncSchedule(
+        base_interval=sync_daemon_base_interval,
+        min_interval=sync_daemon_min_interval,
+        max_interval=sync_daemon_max_interval,
+    )
+    daemon = SyncDaemon(schedule, concurrency=concurrency, rate_budget=rate_budget)
+    lease = ShardLease("daemon", sync_lease_ttl)
+    lease.acquire()
+    logger.info("Started sync daemon (concurrency: %s, rate budget: %s)", concurrency, rate_budget)
+    try:
+        threading.Thread(target=_stop_on_lost_lease, args=(lease, daemon), name="sync-lease-watch", daemon=True).start()
+        daemon.run()
+    except KeyboardInterrupt:
+        logger.info("Stopping sync daemon")
+    finally:
+        daemon.stop()
+        lease.release()
+
+
+def _stop_on_lost_lease(lease: ShardLease, daemon: SyncDaemon) -> None:
+    lease.lost.wait()
+    logger.error("Lost sync daemon lease. Stopping")
+    daemon.stop()
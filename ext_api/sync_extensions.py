@@ -1,30 +1,70 @@
+import datetime
 import logging
+import os
+import socket
 import sys
+import threading
+import time
 import traceback
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Literal, TypedDict
+from urllib.error import URLError
 
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from ext_api.config import (
+    catalog_export_enabled,
+    github_api_credentials,
+    sync_concurrency,
+    sync_lease_ttl,
+)
 from ext_api.entities import Extension, RepoInfo
 from ext_api.github import (
+    GRAPHQL_BATCH_SIZE,
+    GraphQLError,
     JsonFileNotFoundError,
     ProjectNotFoundError,
     VersionsValidationError,
-    get_manifest,
+    get_manifest_and_versions,
     get_repo_info,
-    get_versions,
+    get_repos_info,
+)
+from ext_api.helpers.token_pool import background_priority
+from ext_api.repositories.extensions import bulk_update_extensions, find_extension_by_project_path, iter_extensions
+from ext_api.repositories.sync_state import (
+    acquire_lease,
+    finish_sync_run,
+    get_checkpointed_ids,
+    is_sync_run_finished,
+    release_lease,
+    renew_lease,
+    save_checkpoints,
+    start_sync_run,
 )
-from ext_api.repositories.extensions import get_extensions, update_extension
+from ext_api.s3.catalog_export import export_catalog
 
 logger = logging.getLogger(__name__)
+# max number of extension updates per bulk write
+WRITE_BATCH_SIZE = 500
+# how often a run waiting for the shard lease checks if it's released
+LEASE_POLL_INTERVAL = 10
 
 
-def update_ext_stars(ext: Extension, repo_info: RepoInfo):
-    update_extension(ext["ID"], {"GithubStars": repo_info["stargazers_count"]})
-    logger.info("Extension %s has %s stars", ext["ID"], repo_info["stargazers_count"])
+def get_changes(ext: Extension, data: dict[str, Any]) -> dict[str, Any]:
+    """
+    Returns fields of `data` that differ from the extension
+    """
+    return {field: value for field, value in data.items() if ext.get(field) != value}
 
 
-def update_ext_versions(ext: Extension, repo_info: RepoInfo):
+def read_supported_versions(ext: Extension, repo_info: RepoInfo) -> list[str]:
     supported_versions = []
+    manifest_result, versions_result = get_manifest_and_versions(ext["ProjectPath"], repo_info)
     try:
-        versions = get_versions(ext["ProjectPath"], repo_info)
+        versions = versions_result.result()
         supported_versions = [v["api_version"] for v in versions["versions"]]
     except JsonFileNotFoundError:
         # if versions.json is not found, we assume the extension supports the current latest API version
@@ -34,31 +74,314 @@ def update_ext_versions(ext: Extension, repo_info: RepoInfo):
 
     if not supported_versions:
         # if versions.json is not found or is invalid, get the version from manifest.json
-        manifest = get_manifest(ext["ProjectPath"], repo_info)
+        manifest = manifest_result.result()
         supported_versions = [manifest["api_version"]]
 
-    update_extension(ext["ID"], {"SupportedVersions": supported_versions})
     logger.info("Extension %s supports versions %s", ext["ID"], supported_versions)
+    return supported_versions
 
 
-def sync_extensions():
-    try:
-        extensions = get_extensions()["data"]
-        total = len(extensions)
-        logger.info("Found %s extensions to sync", total)
-        i = 0
-        for ext in extensions:
-            i += 1
+class SyncResult(TypedDict):
+    synced: int
+    # synced stars only, because the repo has the same HEAD commit as on the previous sync
+    unchanged: int
+    unpublished: int
+    failed: int
+    # number of documents that actually changed
+    modified: int
+
+
+@background_priority()
+def sync_extension(
+    ext: Extension, repo_info: RepoInfo | None = None, full: bool = False
+) -> tuple[Literal["synced", "unchanged", "unpublished"], dict[str, Any]]:
+    """
+    Returns sync status and changed fields of the extension.
+    Fetches repo info with GitHub REST API if it's not passed.
+    manifest.json and versions.json are not read again if HEAD commit SHA in repo info (only returned by GraphQL API)
+    is the same as on the previous sync, unless `full` is True.
+    GitHub requests are background ones, so they slow down before using up requests reserved for API users
+    """
+    if not repo_info:
+        try:
+            repo_info = get_repo_info(ext["ProjectPath"])
+        except ProjectNotFoundError:
+            logger.warning("Project not found: %s. Unpublishing.", ext["ProjectPath"])
+            return "unpublished", {"Published": False}
+
+    logger.info("Extension %s has %s stars", ext["ID"], repo_info["stargazers_count"])
+    data: dict[str, Any] = {"GithubStars": repo_info["stargazers_count"]}
+    if not full and "head_sha" in repo_info and ext.get("GithubHeadSha") == repo_info["head_sha"]:
+        logger.info("Extension %s has no new commits", ext["ID"])
+        return "unchanged", get_changes(ext, data)
+
+    data["SupportedVersions"] = read_supported_versions(ext, repo_info)
+    if "head_sha" in repo_info:
+        data["GithubHeadSha"] = repo_info["head_sha"]
+    return "synced", get_changes(ext, data)
+
+
+class PendingUpdates:
+    """
+    Collects changes of extensions from sync threads and writes them with unordered bulk writes of `batch_size`
+    """
+
+    def __init__(self, batch_size: int) -> None:
+        self.batch_size = batch_size
+        self.modified = 0
+        self._updates: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        # a flush returns only after changes collected before it are written, even if another thread writes them
+        self._flush_lock = threading.Lock()
+
+    def add(self, id: str, changes: dict[str, Any]) -> None:
+        if not changes:
+            return
+        with self._lock:
+            self._updates[id] = changes
+            if len(self._updates) < self.batch_size:
+                return
+        self.flush()
+
+    def flush(self) -> bool:
+        """
+        Returns False if some of the changes failed to be written
+        """
+        with self._flush_lock:
+            with self._lock:
+                updates, self._updates = self._updates, {}
+            if not updates:
+                return True
+            is_written = False
+            try:
+                modified = bulk_update_extensions(updates)
+                is_written = True
+            except BulkWriteError as e:
+                logger.exception("Failed to write some of %s extension updates", len(updates))
+                modified = e.details.get("nModified", 0)
+            except PyMongoError:
+                logger.exception("Failed to write %s extension updates", len(updates))
+                modified = 0
+            with self._lock:
+                self.modified += modified
+            return is_written
+
+
+class SyncCheckpoints:
+    """
+    Saves IDs of synced extensions in batches of `batch_size`, so an interrupted run can skip them when it's resumed.
+    Pending changes are written first, so a checkpoint is never saved for changes that were lost
+    """
+
+    def __init__(self, pending_updates: PendingUpdates, batch_size: int) -> None:
+        self.pending_updates = pending_updates
+        self.batch_size = batch_size
+        self._ids: list[str] = []
+        self._lock = threading.Lock()
+
+    def add(self, id: str) -> None:
+        with self._lock:
+            self._ids.append(id)
+            if len(self._ids) < self.batch_size:
+                return
+        self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            ids, self._ids = self._ids, []
+        if not self.pending_updates.flush() or not ids:
+            return
+        try:
+            save_checkpoints(ids)
+        except PyMongoError:
+            logger.exception("Failed to save checkpoints of %s extensions", len(ids))
+
+
+class ShardLease:
+    """
+    Lease of a sync_extensions shard stored in SyncState collection. Only one run at a time can hold it.
+    It's renewed in a background thread and expires after `ttl` seconds if the run crashes
+    """
+
+    def __init__(self, key: str, ttl: float) -> None:
+        self.key = key
+        self.ttl = ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # set if the lease couldn't be renewed in time and might have been taken over by another run
+        self.lost = threading.Event()
+        self._released = threading.Event()
+
+    def acquire(self) -> bool:
+        """
+        Waits until the lease is acquired. Returns True if it had to wait for another run
+        """
+        waited = False
+        while not acquire_lease(self.key, self.owner, self.ttl):
+            if not waited:
+                logger.info("Shard %s is being synced by another run. Waiting for it to finish", self.key)
+            waited = True
+            time.sleep(LEASE_POLL_INTERVAL)
+        threading.Thread(target=self._keep_alive, name="sync-lease", daemon=True).start()
+        return waited
+
+    def _keep_alive(self) -> None:
+        while not self._released.wait(self.ttl / 3):
             try:
-                repo_info = get_repo_info(ext["ProjectPath"])
-            except ProjectNotFoundError:
-                logger.warning("Project not found: %s. Unpublishing.", ext["ProjectPath"])
-                update_extension(ext["ID"], {"Published": False})
+                renewed = renew_lease(self.key, self.owner, self.ttl)
+            except PyMongoError:
+                logger.exception("Failed to renew lease of shard %s", self.key)
                 continue
+            if not renewed:
+                logger.error("Lost lease of shard %s", self.key)
+                self.lost.set()
+                return
+
+    def release(self) -> None:
+        self._released.set()
+        release_lease(self.key, self.owner)
+
+
+def resync_extension(project_path: str) -> bool:
+    """
+    Syncs the published extension of the GitHub project right away.
+    Returns False if there is no such extension
+    """
+    ext = find_extension_by_project_path(project_path)
+    if not ext:
+        logger.info("No published extension found for %s", project_path)
+        return False
+    _, changes = sync_extension(ext)
+    if changes:
+        bulk_update_extensions({ext["ID"]: changes})
+    logger.info("Resynced extension %s. Changed fields: %s", ext["ID"], list(changes))
+    return True
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """
+    >>> parse_shard("1/4")
+    <<< (1, 4)
+    """
+    index, _, count = value.partition("/")
+    shard = (int(index), int(count))
+    if not 0 <= shard[0] < shard[1]:
+        msg = f"Invalid shard {value}. Expected <index>/<count> with 0 <= index < count"
+        raise ValueError(msg)
+    return shard
+
+
+def in_shard(id: str, shard: tuple[int, int]) -> bool:
+    index, count = shard
+    return zlib.crc32(id.encode()) % count == index
+
+
+def get_batch_repos_info(extensions: list[Extension]) -> dict[str, RepoInfo]:
+    """
+    Returns repo info of extensions fetched with one GraphQL request, or an empty dict if that's not possible.
+    Extensions missing from the result are synced with REST API requests
+    """
+    # GraphQL API requires authentication
+    if not github_api_credentials:
+        return {}
+    try:
+        return get_repos_info([ext["ProjectPath"] for ext in extensions])
+    except (URLError, GraphQLError, KeyError, TypeError, ValueError) as e:
+        logger.warning("Failed to fetch repo info with GraphQL API, falling back to REST API: %s", e)
+        return {}
+
+
+def _sync_shard(key: str, shard: tuple[int, int], lease: ShardLease, concurrency: int, full: bool) -> SyncResult:
+    """
+    Syncs extensions of the shard that haven't been synced yet by the current run
+    """
+    result = SyncResult(synced=0, unchanged=0, unpublished=0, failed=0, modified=0)
+    started_at, resumed = start_sync_run(key)
+    checkpointed = get_checkpointed_ids(since=started_at) if resumed else set[str]()
+    if resumed:
+        logger.info("Resuming sync of shard %s. Skipping %s synced extensions", key, len(checkpointed))
+
+    def to_sync(ext: Extension) -> bool:
+        return in_shard(ext["ID"], shard) and ext["ID"] not in checkpointed
+
+    total = sum(1 for ext in iter_extensions(projection={"_id": 0, "ID": 1}) if to_sync(ext))
+    logger.info("Found %s extensions to sync in shard %s (concurrency: %s)", total, key, concurrency)
+    lock = threading.Lock()
+    pending_updates = PendingUpdates(batch_size=WRITE_BATCH_SIZE)
+    checkpoints = SyncCheckpoints(pending_updates, batch_size=WRITE_BATCH_SIZE)
+    # limits the number of extensions waiting in the executor queue
+    queue_slots = threading.BoundedSemaphore(2 * GRAPHQL_BATCH_SIZE)
+
+    def sync(i: int, ext: Extension, repo_info: RepoInfo | None) -> None:
+        queue_slots.release()
+        logger.info("🔃 (%s/%s) Sync extension: %s", i, total, ext["ProjectPath"])
+        try:
+            status, changes = sync_extension(ext, repo_info, full)
+            pending_updates.add(ext["ID"], changes)
+            checkpoints.add(ext["ID"])
+        except Exception:
+            logger.exception("Failed to sync extension %s", ext["ProjectPath"])
+            status = "failed"
+        with lock:
+            result[status] += 1
+
+    extensions = filter(to_sync, iter_extensions())
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="sync") as executor:
+        offset = 0
+        while not lease.lost.is_set() and (batch := list(islice(extensions, GRAPHQL_BATCH_SIZE))):
+            repos_info = get_batch_repos_info(batch)
+            for i, ext in enumerate(batch, start=offset + 1):
+                queue_slots.acquire()
+                executor.submit(sync, i, ext, repos_info.get(ext["ProjectPath"]))
+            offset += len(batch)
+    checkpoints.flush()
+    result["modified"] = pending_updates.modified
+    if lease.lost.is_set():
+        msg = f"Stopped syncing shard {key}, because its lease was lost"
+        raise RuntimeError(msg)
+    finish_sync_run(key)
+    return result
+
+
+def sync_extensions(
+    concurrency: int = sync_concurrency, full: bool = False, shard: tuple[int, int] = (0, 1)
+) -> SyncResult | None:
+    """
+    Syncs published extensions of the shard (index, count) in `concurrency` threads.
+    Extensions are split between shards by CRC32 of their IDs, so several processes can sync the catalog in parallel.
+    Only one run of a shard can be active at a time. Other runs wait, and skip syncing if the active one finishes.
+    An interrupted run is resumed by the next run of the shard, which skips extensions synced since it started.
+    Failure to sync one extension doesn't stop others from syncing.
+    Extensions are streamed from the DB and only a few batches are kept in memory at a time.
+    Repo info is fetched with one GraphQL request per GRAPHQL_BATCH_SIZE extensions.
+    Versions of extensions without new commits are not synced unless `full` is True.
+    All threads slow down together when GitHub rate limit is close to being exhausted
+    """
+    try:
+        key = f"shard:{shard[0]}/{shard[1]}"
+        lease = ShardLease(key, sync_lease_ttl)
+        waiting_since = datetime.datetime.now(datetime.UTC)
+        try:
+            if lease.acquire() and is_sync_run_finished(key, since=waiting_since):
+                logger.info("Shard %s has been synced by another run", key)
+                return SyncResult(synced=0, unchanged=0, unpublished=0, failed=0, modified=0)
+            result = _sync_shard(key, shard, lease, concurrency, full)
+        finally:
+            lease.release()
+
+        logger.info(
+            "Synced %s extensions, unchanged %s, unpublished %s, failed %s. Modified %s documents",
+            result["synced"],
+            result["unchanged"],
+            result["unpublished"],
+            result["failed"],
+            result["modified"],
+        )
 
-            logger.info("🔃 (%s/%s) Sync extension: %s", i, total, ext["ProjectPath"])
-            update_ext_stars(ext, repo_info)
-            update_ext_versions(ext, repo_info)
+        if catalog_export_enabled:
+            export_catalog()
     except Exception as e:
         logger.exception(type(e).__name__)
         traceback.print_exc(file=sys.stderr)
+        return None
+    else:
+        return result
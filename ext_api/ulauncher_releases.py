@@ -0,0 +1,96 @@
+import logging
+import threading
+import time
+from typing import Any, TypedDict
+
+from ext_api.config import ulauncher_releases_max_age, ulauncher_releases_miss_refresh_interval
+from ext_api.github import get_releases
+
+logger = logging.getLogger(__name__)
+
+
+class ReleaseIndexStats(TypedDict):
+    releases: int
+    refreshed_at: float | None
+
+
+class ReleaseIndex:
+    """
+    In-memory index of GitHub releases of a repository by tag name.
+
+    It's built on the first lookup and refreshed in a background thread when it gets older than `max_age` seconds.
+    Lookups of unknown tags (e.g. a release that was just published) refresh it right away,
+    but not more often than once per `miss_refresh_interval` seconds, so bursts of them are answered from memory.
+    Refreshes make conditional requests, so unchanged pages don't count against GitHub rate limit
+    """
+
+    def __init__(self, repo_path: str, max_age: float, miss_refresh_interval: float) -> None:
+        self.repo_path = repo_path
+        self.max_age = max_age
+        self.miss_refresh_interval = miss_refresh_interval
+        self.refreshed_at: float | None = None
+        self._releases: dict[str, dict[str, Any]] | None = None
+        self._attempted_at = 0.0
+        self._refresh_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._refresh_scheduled = False
+
+    def get(self, tag: str) -> dict[str, Any] | None:
+        """
+        Returns None if there is no such release.
+        Raises urllib.error.HTTPError or URLError if the index can't be built
+        """
+        if self._releases is None:
+            self.refresh(min_interval=0)
+        elif tag not in self._releases:
+            try:
+                self.refresh(min_interval=self.miss_refresh_interval)
+            except Exception:
+                logger.exception("Failed to refresh releases of %s", self.repo_path)
+        elif time.time() - (self.refreshed_at or 0) >= self.max_age:
+            self.schedule_refresh()
+        return (self._releases or {}).get(tag)
+
+    def refresh(self, min_interval: float) -> None:
+        """
+        Does nothing if the index was refreshed (or failed to) less than `min_interval` seconds ago.
+        Concurrent calls wait for the one that is already refreshing
+        """
+        started_at = time.time()
+        with self._refresh_lock:
+            if self._releases is not None and started_at - self._attempted_at < min_interval:
+                return
+            if self._releases is not None and self._attempted_at > started_at:
+                # refreshed by another thread while this one was waiting
+                return
+            self._attempted_at = time.time()
+            releases = {release["tag_name"]: release for release in get_releases(self.repo_path)}
+            self._releases = releases
+            self.refreshed_at = time.time()
+        logger.info("Loaded %s releases of %s", len(releases), self.repo_path)
+
+    def schedule_refresh(self) -> None:
+        with self._lock:
+            if self._refresh_scheduled:
+                return
+            self._refresh_scheduled = True
+        threading.Thread(target=self._refresh_in_background, name="ulauncher-releases", daemon=True).start()
+
+    def _refresh_in_background(self) -> None:
+        try:
+            self.refresh(min_interval=self.max_age)
+        except Exception:
+            logger.exception("Failed to refresh releases of %s", self.repo_path)
+        finally:
+            with self._lock:
+                self._refresh_scheduled = False
+
+    def stats(self) -> ReleaseIndexStats:
+        return ReleaseIndexStats(releases=len(self._releases or {}), refreshed_at=self.refreshed_at)
+
+
+ulauncher_releases = ReleaseIndex(
+    "ulauncher/ulauncher",
+    max_age=ulauncher_releases_max_age,
+    miss_refresh_interval=ulauncher_releases_miss_refresh_interval,
+)
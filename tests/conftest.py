@@ -0,0 +1,25 @@
+from typing import Any
+
+from ext_api.entities import Extension
+
+
+def make_extension(id: str, **fields: Any) -> Extension:
+    """
+    Returns a published extension of the github.com/owner/<id> project. Keyword arguments override its fields
+    """
+    project_path = fields.get("ProjectPath", f"owner/{id}")
+    ext = Extension(
+        ID=id,
+        User="github|1",
+        GithubUrl=f"https://github.com/{project_path}",
+        ProjectPath=project_path,
+        Name=id,
+        Description="",
+        DeveloperName="Developer",
+        Images=[],
+        SupportedVersions=["2"],
+        GithubStars=0,
+        Published=True,
+    )
+    ext.update(fields)  # type: ignore
+    return ext
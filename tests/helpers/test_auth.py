@@ -0,0 +1,102 @@
+import json
+import time
+from typing import Any
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+from pytest_mock import MockerFixture
+from urllib3 import HTTPResponse
+
+from ext_api.helpers.auth import AUTH0_CLIENT_ID, AuthError, SigningKeys, parse_token
+from ext_api.helpers.cache import LRUCache
+
+PRIVATE_KEY = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+OTHER_PRIVATE_KEY = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def _token(kid: str = "key-1", key: rsa.RSAPrivateKey = PRIVATE_KEY, **claims: Any) -> str:
+    payload = {"sub": "github|1", "aud": AUTH0_CLIENT_ID, "exp": int(time.time()) + 3600, **claims}
+    return jwt.encode(payload, key, algorithm="RS256", headers={"kid": kid})
+
+
+def _jwks_response(**keys: rsa.RSAPrivateKey) -> HTTPResponse:
+    jwks = [{**json.loads(RSAAlgorithm.to_jwk(key.public_key())), "kid": kid} for kid, key in keys.items()]
+    return HTTPResponse(body=json.dumps({"keys": jwks}).encode(), status=200)
+
+
+@pytest.fixture(autouse=True)
+def http_request(mocker: MockerFixture):
+    return mocker.patch("ext_api.helpers.auth.http.request", return_value=_jwks_response(**{"key-1": PRIVATE_KEY}))
+
+
+@pytest.fixture
+def signing_keys(mocker: MockerFixture) -> SigningKeys:
+    keys = SigningKeys("https://auth0.test/.well-known/jwks.json", None, max_age=3600, miss_refresh_interval=60)
+    return mocker.patch("ext_api.helpers.auth.signing_keys", keys)
+
+
+@pytest.fixture
+def verified_tokens(mocker: MockerFixture) -> LRUCache[bytes, dict[str, Any]]:
+    return mocker.patch("ext_api.helpers.auth.verified_tokens", LRUCache(maxsize=10, ttl=3600))
+
+
+@pytest.mark.usefixtures("signing_keys")
+def test_parse_token__reuses_verified_claims(mocker: MockerFixture, verified_tokens: LRUCache[bytes, dict[str, Any]]):
+    decode = mocker.spy(jwt, "decode")
+    token = _token()
+
+    assert parse_token(f"Bearer {token}")["sub"] == "github|1"
+    assert parse_token(token)["sub"] == "github|1"
+
+    decode.assert_called_once()
+    assert verified_tokens.stats()["hits"] == 1
+
+
+@pytest.mark.usefixtures("signing_keys", "verified_tokens")
+def test_parse_token__verified_claims_expire_with_token(mocker: MockerFixture):
+    monotonic = mocker.patch("ext_api.helpers.cache.time.monotonic", return_value=100.0)
+    decode = mocker.spy(jwt, "decode")
+    token = _token(exp=int(time.time()) + 30)
+    parse_token(token)
+
+    monotonic.return_value = 129.0
+    parse_token(token)
+    assert decode.call_count == 1
+    monotonic.return_value = 131.0
+    parse_token(token)
+    assert decode.call_count == 2
+
+
+@pytest.mark.usefixtures("signing_keys")
+def test_parse_token__invalid_tokens_are_not_cached(verified_tokens: LRUCache[bytes, dict[str, Any]]):
+    for _ in range(2):
+        with pytest.raises(AuthError, match="Signature verification failed"):
+            parse_token(_token(key=OTHER_PRIVATE_KEY))
+
+    assert verified_tokens.stats()["size"] == 0
+
+
+def test_signing_keys__unknown_key_refreshes_keys(mocker: MockerFixture, signing_keys: SigningKeys, http_request: Any):
+    signing_keys.start()
+    http_request.return_value = _jwks_response(**{"key-1": PRIVATE_KEY, "key-2": OTHER_PRIVATE_KEY})
+    mocker.patch("ext_api.helpers.auth.time.time", return_value=time.time() + 61)
+
+    assert parse_token(_token(kid="key-2", key=OTHER_PRIVATE_KEY))["sub"] == "github|1"
+    # not refreshed again within miss_refresh_interval
+    with pytest.raises(AuthError, match="Unknown signing key key-3"):
+        parse_token(_token(kid="key-3"))
+    assert http_request.call_count == 2
+
+
+def test_signing_keys__removed_key_invalidates_verified_tokens(
+    signing_keys: SigningKeys, http_request: Any, verified_tokens: LRUCache[bytes, dict[str, Any]]
+):
+    parse_token(_token())
+    http_request.return_value = _jwks_response(**{"key-2": OTHER_PRIVATE_KEY})
+    signing_keys.refresh(min_interval=0)
+
+    assert verified_tokens.stats()["size"] == 0
+    with pytest.raises(AuthError, match="Unknown signing key key-1"):
+        parse_token(_token())
@@ -0,0 +1,121 @@
+import threading
+import time
+
+import pytest
+from pytest_mock import MockerFixture
+
+from ext_api.helpers.cache import LRUCache
+
+
+def test_lru_cache__returns_stored_value():
+    cache: LRUCache[str, int] = LRUCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_lru_cache__evicts_least_recently_used():
+    cache: LRUCache[str, int] = LRUCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_lru_cache__expires_entries(mocker: MockerFixture):
+    monotonic = mocker.patch("ext_api.helpers.cache.time.monotonic", return_value=100.0)
+    cache: LRUCache[str, int] = LRUCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+
+    monotonic.return_value = 109.0
+    assert cache.get("a") == 1
+    monotonic.return_value = 110.0
+    assert cache.get("a") is None
+
+
+def test_lru_cache__skips_values_loaded_before_invalidation():
+    cache: LRUCache[str, int] = LRUCache(maxsize=2, ttl=60)
+    generation = cache.generation
+    # a write invalidates the cache while the value is being loaded
+    cache.clear()
+    cache.set("a", 1, generation=generation)
+    assert cache.get("a") is None
+
+    generation = cache.generation
+    cache.set("a", 2, generation=generation)
+    assert cache.get("a") == 2
+
+
+def test_lru_cache__get_or_load_skips_values_loaded_before_invalidation():
+    cache: LRUCache[str, int] = LRUCache(maxsize=2, ttl=60)
+
+    def load() -> int:
+        cache.delete("a")
+        return 1
+
+    assert cache.get_or_load("a", load) == 1
+    assert cache.get("a") is None
+
+
+def test_lru_cache__entry_ttl_is_capped_by_cache_ttl(mocker: MockerFixture):
+    monotonic = mocker.patch("ext_api.helpers.cache.time.monotonic", return_value=100.0)
+    cache: LRUCache[str, int] = LRUCache(maxsize=3, ttl=10)
+    cache.set("a", 1, ttl=5)
+    cache.set("b", 2, ttl=60)
+    cache.set("c", 3, ttl=-1)
+
+    monotonic.return_value = 105.0
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert cache.get("c") is None
+    monotonic.return_value = 110.0
+    assert cache.get("b") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_lru_cache__clear():
+    cache: LRUCache[str, int] = LRUCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.clear()
+
+    assert cache.get("a") is None
+
+
+def test_lru_cache__get_or_load__loads_once_for_concurrent_calls():
+    cache: LRUCache[str, int] = LRUCache(maxsize=2, ttl=60)
+    calls: list[str] = []
+    results: list[int] = []
+
+    def load() -> int:
+        calls.append("a")
+        time.sleep(0.05)
+        return 1
+
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("a", load))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == ["a"]
+    assert results == [1] * 5
+    assert cache.get_or_load("a", load) == 1
+
+
+def test_lru_cache__get_or_load__doesnt_cache_exceptions():
+    cache: LRUCache[str, int] = LRUCache(maxsize=2, ttl=60)
+
+    def fail() -> int:
+        msg = "failed"
+        raise ValueError(msg)
+
+    with pytest.raises(ValueError, match="failed"):
+        cache.get_or_load("a", fail)
+    assert cache.get_or_load("a", lambda: 2) == 2
@@ -0,0 +1,27 @@
+import gzip
+
+from pytest_mock import MockerFixture
+
+from ext_api.helpers.compression import choose_encoding
+from ext_api.helpers.response import EncodedResponse
+
+
+def test_choose_encoding(mocker: MockerFixture):
+    mocker.patch("ext_api.helpers.compression.supported_encodings", return_value=["br", "gzip"])
+
+    assert choose_encoding("gzip, deflate, br") == "br"
+    assert choose_encoding("gzip, br;q=0") == "gzip"
+    assert choose_encoding("deflate") is None
+    assert choose_encoding("*") == "br"
+    assert choose_encoding("gzip;q=0, *;q=0") is None
+    assert choose_encoding("") is None
+    assert choose_encoding(None) is None
+
+
+def test_encoded_response__variant():
+    encoded = EncodedResponse(b'{"data": []}' * 100)
+
+    assert gzip.decompress(encoded.variant("gzip")) == encoded.body
+    assert encoded.variant("gzip") is encoded.variant("gzip")
+    assert encoded.variant_etag("gzip") != encoded.etag
+    assert encoded.variant_etag(None) == encoded.etag
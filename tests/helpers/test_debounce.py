@@ -0,0 +1,50 @@
+import threading
+
+from ext_api.helpers.debounce import Debouncer
+
+
+def test_debouncer__coalesces_calls_with_same_key():
+    debouncer = Debouncer(delay=0.05)
+    done = threading.Event()
+    calls: list[str] = []
+
+    def fn() -> None:
+        calls.append("a")
+        done.set()
+
+    assert debouncer.call("a", fn)
+    assert not debouncer.call("a", fn)
+    assert done.wait(1)
+    assert calls == ["a"]
+    assert debouncer.call("a", fn)
+
+
+def test_debouncer__queues_one_run_after_running_call():
+    debouncer = Debouncer(delay=0.01)
+    started = threading.Event()
+    release = threading.Event()
+    done = threading.Event()
+    running: list[int] = []
+    overlapped: list[bool] = []
+    calls: list[str] = []
+
+    def fn() -> None:
+        overlapped.append(bool(running))
+        running.append(1)
+        started.set()
+        release.wait(1)
+        calls.append("a")
+        running.pop()
+        if len(calls) == 2:
+            done.set()
+
+    assert debouncer.call("a", fn)
+    assert started.wait(1)
+    # made while the first call is running
+    assert debouncer.call("a", fn)
+    assert not debouncer.call("a", fn)
+    release.set()
+
+    assert done.wait(1)
+    assert calls == ["a", "a"]
+    assert overlapped == [False, False]
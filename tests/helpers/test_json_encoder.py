@@ -0,0 +1,30 @@
+import datetime
+
+from bson import ObjectId, json_util
+
+from ext_api.helpers.json_encoder import dumps
+
+
+def test_dumps__same_output_as_bson_json_util():
+    doc = {
+        "ID": "github-owner-repo",
+        "Name": 'Ünicode "quoted" name',
+        "Images": ["https://example.com/1.png"],
+        "SupportedVersions": ["2", "3"],
+        "GithubStars": 12,
+        "Published": True,
+        "Score": 1.5,
+        "Missing": None,
+        "CreatedAt": datetime.datetime(2024, 5, 1, 12, 30, 15, 123456),
+        "UpdatedAt": datetime.datetime(2024, 5, 1, tzinfo=datetime.UTC),
+        "Old": datetime.datetime(1960, 1, 1),
+        "Local": datetime.datetime(2024, 5, 1, tzinfo=datetime.timezone(datetime.timedelta(hours=3))),
+        "Oid": ObjectId("65f0c0ffee0000000000abcd"),
+    }
+    payload = {"data": [doc, doc], "offset": 0, "has_more": False, "next_cursor": None}
+
+    assert dumps(payload) == json_util.dumps(payload)
+
+
+def test_dumps__iterables():
+    assert dumps({"data": (i for i in range(3))}) == '{"data": [0, 1, 2]}'
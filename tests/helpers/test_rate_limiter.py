@@ -0,0 +1,47 @@
+from pytest_mock import MockerFixture
+
+from ext_api.helpers.rate_limiter import RESET_MARGIN, RateLimiter
+
+
+def _headers(limit: int, remaining: int, reset: float) -> dict[str, str]:
+    return {"X-RateLimit-Limit": str(limit), "X-RateLimit-Remaining": str(remaining), "X-RateLimit-Reset": str(reset)}
+
+
+def test_acquire__no_delay_without_headers_or_with_enough_requests_left(mocker: MockerFixture):
+    mocker.patch("time.time", return_value=1000.0)
+    limiter = RateLimiter(reserve=10)
+    assert limiter.acquire() == 0
+
+    limiter.update(_headers(5000, 4000, 2000))
+    assert limiter.acquire() == 0
+    assert limiter.remaining == 3999
+
+
+def test_acquire__spreads_requests_until_reset(mocker: MockerFixture):
+    mocker.patch("time.time", return_value=1000.0)
+    limiter = RateLimiter(reserve=10)
+    limiter.update(_headers(5000, 110, 2000))
+
+    # 100 requests left (above reserve) for 1000 sec
+    assert limiter.acquire() == 0
+    assert limiter.acquire() == 10
+    assert abs(limiter.acquire() - 20) < 0.2
+
+
+def test_acquire__pauses_until_reset_at_reserve(mocker: MockerFixture):
+    time = mocker.patch("time.time", return_value=1000.0)
+    limiter = RateLimiter(reserve=10)
+    limiter.update(_headers(5000, 10, 1600))
+
+    assert limiter.acquire() == 600 + RESET_MARGIN
+
+    time.return_value = 1600.0
+    assert limiter.acquire() == 0
+
+
+def test_update__ignores_responses_without_headers():
+    limiter = RateLimiter(reserve=10)
+    limiter.update({"X-RateLimit-Remaining": "abc", "X-RateLimit-Reset": "1"})
+    limiter.update({})
+
+    assert limiter.remaining is None
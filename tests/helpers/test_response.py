@@ -0,0 +1,15 @@
+from ext_api.helpers.response import EncodedResponse, etag_matches
+
+
+def test_encoded_response__etag_depends_on_body():
+    assert EncodedResponse(b'{"a": 1}').etag == EncodedResponse(b'{"a": 1}').etag
+    assert EncodedResponse(b'{"a": 1}').etag != EncodedResponse(b'{"a": 2}').etag
+
+
+def test_etag_matches():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('"xyz", W/"abc"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"xyz"', '"abc"')
+    assert not etag_matches(None, '"abc"')
+    assert not etag_matches("", '"abc"')
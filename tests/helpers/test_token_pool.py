@@ -0,0 +1,64 @@
+import pytest
+from pytest_mock import MockerFixture
+
+from ext_api.helpers.token_pool import TokenPool, background_priority, request_priority
+
+
+def _headers(remaining: int, reset: float = 2000, resource: str = "core") -> dict[str, str]:
+    return {
+        "X-RateLimit-Limit": "5000",
+        "X-RateLimit-Remaining": str(remaining),
+        "X-RateLimit-Reset": str(reset),
+        "X-RateLimit-Resource": resource,
+    }
+
+
+@pytest.fixture(autouse=True)
+def now(mocker: MockerFixture):
+    mocker.patch("time.time", return_value=1000.0)
+
+
+def test_select__round_robin_without_rate_limit_info():
+    pool = TokenPool(["a:1", "b:2", "c:3"], reserve=10)
+    assert [pool.select() for _ in range(4)] == ["a:1", "b:2", "c:3", "a:1"]
+
+
+def test_select__prefers_token_with_most_requests_left():
+    pool = TokenPool(["a:1", "b:2"], reserve=10)
+    pool.update("a:1", _headers(remaining=100))
+    pool.update("b:2", _headers(remaining=3000))
+    # GraphQL API limit is separate
+    pool.update("b:2", _headers(remaining=1, resource="graphql"))
+
+    assert {pool.select() for _ in range(3)} == {"b:2"}
+    assert pool.limit == 10000
+
+
+def test_acquire__only_background_requests_wait_for_reserve(mocker: MockerFixture):
+    sleep = mocker.patch("time.sleep")
+    pool = TokenPool(["a:1", "b:2"], reserve=10)
+    pool.update("a:1", _headers(remaining=10))
+    pool.update("b:2", _headers(remaining=5))
+
+    assert pool.acquire() == "a:1"
+    sleep.assert_not_called()
+
+    with background_priority():
+        assert pool.acquire() == "a:1"
+    sleep.assert_called_once()
+    assert sleep.call_args.args[0] > 1000
+
+
+def test_background_priority__restores_priority():
+    @background_priority()
+    def get_priority() -> str:
+        return request_priority.get()
+
+    assert get_priority() == "background"
+    assert request_priority.get() == "interactive"
+
+
+def test_unauthenticated_pool():
+    pool = TokenPool([], reserve=10)
+    assert pool.acquire("background") == ""
+    assert pool.limit is None
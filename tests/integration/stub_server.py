@@ -1,11 +1,12 @@
 # pyright: reportUnknownVariableType=false
 
+import hashlib
 import json
 import os
 from pathlib import Path
 from typing import Any
 
-from bottle import Bottle, HTTPResponse, response, run
+from bottle import Bottle, HTTPResponse, request, response, run
 
 FIXTURES_DIR = Path(__file__).parent / "fixtures"
 AUTH_DIR = FIXTURES_DIR / "auth"
@@ -14,8 +15,15 @@ GITHUB_DIR = FIXTURES_DIR / "github"
 app = Bottle()
 
 
-def _json_fixture(name: str) -> str:
-    return (GITHUB_DIR / name).read_text(encoding="utf-8")
+def _json_fixture(name: str) -> HTTPResponse:
+    """
+    Responds with ETag like GitHub does, and with 304 to requests with matching If-None-Match
+    """
+    body = (GITHUB_DIR / name).read_text(encoding="utf-8")
+    etag = f'"{hashlib.sha256(body.encode()).hexdigest()}"'
+    if request.get_header("If-None-Match") == etag:
+        return HTTPResponse(status=304, headers={"ETag": etag})
+    return HTTPResponse(body=body, headers={"ETag": etag, "Content-Type": "application/json"})
 
 
 @app.get("/pem")  # type: ignore[misc]
@@ -27,15 +35,40 @@ def pem() -> HTTPResponse:
 
 
 @app.get("/repos/<owner>/<repo>")  # type: ignore[misc]
-def repo(owner: str, repo: str) -> str:
+def repo(owner: str, repo: str) -> str | HTTPResponse:
     if (owner, repo) not in {("stub-owner", "stub-repo"), ("stub-owner", "legacy-repo")}:
         response.status = 404
         return json.dumps({"message": "Not Found"})
     return _json_fixture(f"{repo}-repo.json")
 
 
+@app.post("/graphql")  # type: ignore[misc]
+def graphql() -> str:
+    """
+    Answers repository queries sent by get_repos_info() (aliases r0..rN with $ownerN and $nameN variables)
+    """
+    variables: dict[str, str] = request.json["variables"]
+    data: dict[str, Any] = {}
+    errors: list[dict[str, Any]] = []
+    for i in range(len(variables) // 2):
+        owner, repo = variables[f"owner{i}"], variables[f"name{i}"]
+        if (owner, repo) not in {("stub-owner", "stub-repo"), ("stub-owner", "legacy-repo")}:
+            data[f"r{i}"] = None
+            errors.append({"type": "NOT_FOUND", "path": [f"r{i}"], "message": f"Could not resolve {owner}/{repo}"})
+            continue
+        info = json.loads((GITHUB_DIR / f"{repo}-repo.json").read_text(encoding="utf-8"))
+        data[f"r{i}"] = {
+            "stargazerCount": info["stargazers_count"],
+            "defaultBranchRef": {
+                "name": info["default_branch"],
+                "target": {"oid": hashlib.sha1(repo.encode(), usedforsecurity=False).hexdigest()},
+            },
+        }
+    return json.dumps({"data": data, "errors": errors} if errors else {"data": data})
+
+
 @app.get("/raw/<owner>/<repo>/<commit>/<filename>")  # type: ignore[misc]
-def raw(owner: str, repo: str, commit: str, filename: str) -> str:
+def raw(owner: str, repo: str, commit: str, filename: str) -> str | HTTPResponse:
     if (
         (owner, repo) == ("stub-owner", "stub-repo")
         and commit == "main"
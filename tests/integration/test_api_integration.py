@@ -1,8 +1,22 @@
+import hashlib
+import hmac
+import json
 import os
+import time
 from typing import Any, cast
 
 import pytest
 
+from ext_api.github import get_repos_info
+from ext_api.repositories.sync_state import (
+    acquire_lease,
+    get_checkpointed_ids,
+    release_lease,
+    save_checkpoints,
+    start_sync_run,
+)
+from ext_api.s3.catalog_export import export_catalog
+
 pytestmark = pytest.mark.skipif(os.getenv("RUN_INTEGRATION") != "1", reason="integration tests require Podman Compose")
 USER_ID = "github|integration-user"
 
@@ -153,3 +167,117 @@ def test_extensions_can_be_searched_by_project_path_and_description(
     project_path_data = cast("list[dict[str, Any]]", project_path_payload["data"])
     assert len(project_path_data) == 1
     assert project_path_data[0]["ID"] == "github-stub-owner-stub-repo"
+
+
+def test_extensions_can_be_paginated_with_cursor(api_client: Any, auth_header: dict[str, str]) -> None:
+    _create_extension(api_client, auth_header, "https://github.com/stub-owner/stub-repo", "Stub Extension")
+    _create_extension(api_client, auth_header, "https://github.com/stub-owner/legacy-repo", "Legacy Extension")
+
+    first_response = api_client.request("GET", "/extensions?limit=1")
+    assert first_response.status == 200
+    first_payload = api_client.parse_json(first_response)
+    assert first_payload["has_more"] is True
+    assert cast("list[dict[str, Any]]", first_payload["data"])[0]["ID"] == "github-stub-owner-stub-repo"
+
+    second_response = api_client.request("GET", f"/extensions?limit=1&cursor={first_payload['next_cursor']}")
+    assert second_response.status == 200
+    second_payload = api_client.parse_json(second_response)
+    assert second_payload["has_more"] is False
+    assert second_payload["next_cursor"] is None
+    assert cast("list[dict[str, Any]]", second_payload["data"])[0]["ID"] == "github-stub-owner-legacy-repo"
+
+    invalid_response = api_client.request("GET", "/extensions?cursor=invalid")
+    assert invalid_response.status == 400
+
+
+def test_catalog_can_be_exported_to_s3(api_client: Any, auth_header: dict[str, str], s3_client: Any) -> None:
+    _create_extension(api_client, auth_header, "https://github.com/stub-owner/stub-repo", "Stub Extension")
+    _create_extension(api_client, auth_header, "https://github.com/stub-owner/legacy-repo", "Legacy Extension")
+
+    first_result = export_catalog()
+    assert first_result["uploaded"] > 0
+    assert first_result["unchanged"] == 0
+
+    page = s3_client.get_object(Bucket=os.environ["EXT_IMAGES_BUCKET_NAME"], Key="catalog/3/GithubStars/desc/0.json")
+    assert page["ContentType"] == "application/json"
+    data = cast("list[dict[str, Any]]", json.loads(page["Body"].read())["data"])
+    assert [ext["ID"] for ext in data] == ["github-stub-owner-legacy-repo"]
+
+    second_result = export_catalog()
+    assert second_result["uploaded"] == 0
+    assert second_result["unchanged"] == first_result["uploaded"]
+
+
+def test_github_responses_are_stored_for_conditional_requests(
+    api_client: Any, auth_header: dict[str, str], mongo_db: Any
+) -> None:
+    _create_extension(api_client, auth_header, "https://github.com/stub-owner/stub-repo", "Stub Extension")
+
+    cached = {entry["Url"]: entry for entry in mongo_db.GithubCache.find({"Url": {"$regex": "stub-repo"}})}
+    assert len(cached) == 3
+    assert all(entry["ETag"] for entry in cached.values())
+
+    # repeated requests get 304 from the stub and are served from the stored bodies
+    delete_response = api_client.request("DELETE", "/extensions/github-stub-owner-stub-repo", headers=auth_header)
+    assert delete_response.status == 204
+    _create_extension(api_client, auth_header, "https://github.com/stub-owner/stub-repo", "Stub Extension")
+    get_response = api_client.request("GET", "/extensions/github-stub-owner-stub-repo")
+    assert api_client.parse_json(get_response)["data"]["SupportedVersions"] == ["5", "4"]
+
+
+def test_repos_info_can_be_fetched_in_one_graphql_request() -> None:
+    result = get_repos_info(["stub-owner/stub-repo", "stub-owner/missing-repo", "stub-owner/legacy-repo"])
+
+    assert set(result) == {"stub-owner/stub-repo", "stub-owner/legacy-repo"}
+    assert result["stub-owner/stub-repo"]["stargazers_count"] == 42
+    assert result["stub-owner/stub-repo"]["default_branch"] == "main"
+    assert len(result["stub-owner/stub-repo"].get("head_sha", "")) == 40
+
+
+def test_github_star_webhook_resyncs_extension(api_client: Any, auth_header: dict[str, str], mongo_db: Any) -> None:
+    _create_extension(api_client, auth_header, "https://github.com/stub-owner/stub-repo", "Stub Extension")
+    mongo_db.Extensions.update_one({"ID": "github-stub-owner-stub-repo"}, {"$set": {"GithubStars": 1}})
+    payload = {"action": "created", "repository": {"full_name": "Stub-Owner/stub-repo", "default_branch": "main"}}
+    body = json.dumps(payload).encode("utf-8")
+    secret = os.environ["GITHUB_WEBHOOK_SECRET"].encode()
+
+    rejected = api_client.request("POST", "/webhooks/github", headers={"X-GitHub-Event": "star"}, json_body=payload)
+    assert rejected.status == 403
+
+    signature = "sha256=" + hmac.new(secret, body, hashlib.sha256).hexdigest()
+    response = api_client.request(
+        "POST",
+        "/webhooks/github",
+        headers={"X-GitHub-Event": "star", "X-Hub-Signature-256": signature},
+        json_body=payload,
+    )
+    assert response.status == 202
+
+    deadline = time.time() + 10
+    while mongo_db.Extensions.find_one({"ID": "github-stub-owner-stub-repo"})["GithubStars"] != 42:
+        assert time.time() < deadline, "Extension was not resynced"
+        time.sleep(0.2)
+
+
+def test_sync_shard_lease_is_held_by_one_run_at_a_time(mongo_db: Any) -> None:
+    key = "shard:integration/1"
+    mongo_db.SyncState.delete_many({"Key": key})
+
+    assert acquire_lease(key, "first", ttl=60)
+    assert not acquire_lease(key, "second", ttl=60)
+    release_lease(key, "first")
+    assert acquire_lease(key, "second", ttl=60)
+    release_lease(key, "second")
+
+
+def test_interrupted_sync_run_is_resumed(mongo_db: Any) -> None:
+    key = "shard:integration/2"
+    mongo_db.SyncState.delete_many({"Key": key})
+
+    _, resumed = start_sync_run(key)
+    assert not resumed
+    save_checkpoints(["integration-ext"])
+
+    resumed_at, resumed = start_sync_run(key)
+    assert resumed
+    assert "integration-ext" in get_checkpointed_ids(since=resumed_at)
@@ -0,0 +1,27 @@
+import datetime
+
+from bson.json_util import dumps
+
+from ext_api.entities import Extension
+from ext_api.repositories.catalog_snapshots import build_snapshots
+from tests.conftest import make_extension
+
+
+def _day(day: int) -> datetime.datetime:
+    return datetime.datetime(2024, 1, day, tzinfo=datetime.UTC)
+
+
+def test_build_snapshots__bodies_match_regular_responses():
+    a = make_extension("a", GithubStars=10, SupportedVersions=["2"], CreatedAt=_day(3))
+    b = make_extension("b", GithubStars=30, SupportedVersions=["2", "3"], CreatedAt=_day(1))
+    c = make_extension("c", GithubStars=10, SupportedVersions=["3"], CreatedAt=_day(2))
+    snapshots = build_snapshots([a, b, c])
+
+    def expected(data: list[Extension]) -> bytes:
+        return dumps({"data": data, "offset": 0, "has_more": False, "next_cursor": None}).encode()
+
+    assert snapshots[("GithubStars", -1, None)].response.body == expected([b, c, a])
+    assert snapshots[("GithubStars", 1, None)].response.body == expected([a, c, b])
+    assert snapshots[("CreatedAt", -1, "3")].response.body == expected([c, b])
+    assert snapshots[("CreatedAt", 1, "2")].response.body == expected([b, a])
+    assert ("GithubStars", -1, "4") not in snapshots
@@ -0,0 +1,113 @@
+import datetime
+from typing import Any
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_mock import MockerFixture
+
+from ext_api.repositories.extensions import (
+    InvalidPageCursorError,
+    PageCursor,
+    build_projection,
+    bulk_update_extensions,
+    decode_page_cursor,
+    encode_page_cursor,
+    get_extensions,
+)
+from ext_api.repositories.search_index import SearchIndex
+from tests.conftest import make_extension
+
+
+def test_page_cursor__roundtrip():
+    created_at = datetime.datetime(2024, 5, 1, 12, 30, tzinfo=datetime.UTC)
+    for value in [42, created_at]:
+        cursor = PageCursor(sort_by="GithubStars", sort_order=-1, value=value, id="github-owner-repo")
+        decoded = decode_page_cursor(encode_page_cursor(cursor))
+
+        assert decoded["sort_by"] == "GithubStars"
+        assert decoded["sort_order"] == -1
+        assert decoded["id"] == "github-owner-repo"
+        assert decoded["value"] == value
+
+
+def test_decode_page_cursor__invalid__raises():
+    with pytest.raises(InvalidPageCursorError):
+        decode_page_cursor("not a cursor")
+    with pytest.raises(InvalidPageCursorError):
+        decode_page_cursor("WzEsIDJd")  # base64 of [1, 2]
+
+
+def test_build_projection__fields():
+    assert build_projection(["Name", "GithubStars"]) == {"_id": 0, "ID": 1, "Name": 1, "GithubStars": 1}
+
+
+def test_build_projection__card_preset():
+    projection = build_projection(["card"])
+    assert projection["Images"] == {"$slice": 1}
+    assert projection["_id"] == 0
+    assert "User" not in projection
+
+    assert build_projection(["Images", "card"])["Images"] == 1
+
+
+def test_get_extensions__omits_sort_field_that_was_not_requested(mocker: MockerFixture):
+    created_at = datetime.datetime(2024, 5, 1, 12, 30, tzinfo=datetime.UTC)
+    collection = mocker.patch("ext_api.repositories.extensions.extension_collection")
+    collection.find.return_value.sort.return_value.limit.return_value = [
+        {"ID": "a", "Name": "A", "CreatedAt": created_at},
+        {"ID": "b", "Name": "B", "CreatedAt": created_at},
+    ]
+
+    result = get_extensions(limit=1, sort_by="CreatedAt", projection=build_projection(["Name"]))
+
+    assert collection.find.call_args.args[1]["CreatedAt"] == 1
+    assert result["data"] == [{"ID": "a", "Name": "A"}]
+    assert result["next_cursor"]
+    assert decode_page_cursor(result["next_cursor"])["value"] == created_at
+
+
+@pytest.mark.parametrize(
+    ("sort_order", "value", "expected"),
+    [
+        (1, None, [{"CreatedAt": None, "ID": {"$gt": "b"}}, {"CreatedAt": {"$ne": None}}]),
+        (-1, None, [{"CreatedAt": None, "ID": {"$lt": "b"}}]),
+        (1, 5, [{"CreatedAt": {"$gt": 5}}, {"CreatedAt": 5, "ID": {"$gt": "b"}}]),
+        (-1, 5, [{"CreatedAt": {"$lt": 5}}, {"CreatedAt": 5, "ID": {"$lt": "b"}}, {"CreatedAt": None}]),
+    ],
+)
+def test_get_extensions__after_cursor_handles_null_values(
+    mocker: MockerFixture, sort_order: int, value: Any, expected: list[dict[str, Any]]
+):
+    collection = mocker.patch("ext_api.repositories.extensions.extension_collection")
+    cursor = PageCursor(sort_by="CreatedAt", sort_order=sort_order, value=value, id="b")
+
+    get_extensions(limit=None, sort_by="CreatedAt", sort_order=sort_order, after=cursor)
+
+    assert collection.find.call_args.args[0]["$or"] == expected
+
+
+def test_build_projection__unknown_field__raises():
+    with pytest.raises(AssertionError):
+        build_projection(["_id"])
+    with pytest.raises(AssertionError):
+        build_projection(["GithubHeadSha"])
+
+
+def test_bulk_update_extensions__updates_search_index_and_notifies_once(mocker: MockerFixture):
+    index = SearchIndex(max_age=300)
+    index.rebuild([make_extension("a", GithubStars=1), make_extension("b", GithubStars=1)])
+    mocker.patch("ext_api.repositories.extensions.search_index", index)
+    collection = mocker.patch("ext_api.repositories.extensions.extension_collection")
+    collection.bulk_write.return_value.modified_count = 2
+    collection.find.return_value = [
+        make_extension("a", GithubStars=10),
+        make_extension("b", GithubStars=1, Published=False),
+    ]
+    listener = MagicMock()
+    mocker.patch("ext_api.repositories.extensions._change_listeners", [listener])
+
+    assert bulk_update_extensions({"a": {"GithubStars": 10}, "b": {"Published": False}}) == 2
+
+    listener.assert_called_once_with(["a", "b"])
+    assert [ext["GithubStars"] for ext in index.search("a", [], "GithubStars", -1)] == [10]
+    assert index.search("b", [], "GithubStars", -1) == []
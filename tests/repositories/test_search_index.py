@@ -0,0 +1,142 @@
+import datetime
+from typing import Any
+
+from pytest_mock import MockerFixture
+
+from ext_api.entities import Extension
+from ext_api.repositories.search_index import SearchIndex, apply_projection, tokenize
+from tests.conftest import make_extension
+
+FIVE_HOURS_EAST = datetime.timezone(datetime.timedelta(hours=5))
+
+
+def _ids(extensions: list[Extension]) -> list[str]:
+    return [ext["ID"] for ext in extensions]
+
+
+def _index(*extensions: Extension) -> SearchIndex:
+    index = SearchIndex(max_age=300)
+    index.rebuild(list(extensions))
+    return index
+
+
+def test_tokenize():
+    assert tokenize("Hello, World_Wide web-Search 2") == ["hello", "world", "wide", "web", "search", "2"]
+
+
+def test_search__matches_prefixes_of_all_terms():
+    index = _index(
+        make_extension("a", Name="Calculator", Description="Evaluates math expressions"),
+        make_extension("b", Name="Currency converter", Description="Converts money"),
+        make_extension("c", Name="Unit converter", Description="Converts units and math"),
+    )
+
+    assert _ids(index.search("calc")) == ["a"]
+    assert sorted(_ids(index.search("conv"))) == ["b", "c"]
+    assert _ids(index.search("conv math")) == ["c"]
+    assert _ids(index.search("the MATH")) == ["c", "a"]
+    assert index.search("nothing") == []
+    assert index.search("  ") == []
+
+
+def test_search__ranks_by_field_weight_then_sort_order():
+    index = _index(
+        make_extension("a", Name="Translate", GithubStars=5),
+        make_extension("b", Name="Dictionary", Description="Translate words", GithubStars=50),
+        make_extension("c", Name="Translator", GithubStars=10),
+    )
+
+    # exact name match is ranked higher than prefix match, name is ranked higher than description
+    assert _ids(index.search("translat")) == ["c", "a", "b"]
+    assert _ids(index.search("translate")) == ["a", "b"]
+    assert _ids(index.search("transl")) == ["c", "a", "b"]
+    assert _ids(index.search("transl", sort_order=1)) == ["a", "c", "b"]
+
+
+def test_search__sorts_naive_and_aware_datetimes():
+    # extensions loaded from Mongo have naive UTC datetimes, ones created by this process have aware ones
+    index = _index(
+        make_extension("a", Name="Calculator", CreatedAt=datetime.datetime(2024, 1, 2)),
+        make_extension("b", Name="Calendar", CreatedAt=datetime.datetime(2024, 1, 3)),
+    )
+    index.upsert(make_extension("c", Name="Calc", CreatedAt=datetime.datetime(2024, 1, 2, 12, tzinfo=datetime.UTC)))
+    index.upsert(
+        make_extension("d", Name="Calcium", CreatedAt=datetime.datetime(2024, 1, 4, 1, tzinfo=FIVE_HOURS_EAST))
+    )
+
+    assert _ids(index.search("cal", sort_by="CreatedAt", sort_order=1)) == ["a", "c", "b", "d"]
+
+
+def test_search__phrases_and_versions():
+    index = _index(
+        make_extension("a", Name="Web search", Description="Search the web", SupportedVersions=["2"]),
+        make_extension("b", Name="Search", Description="Web pages search", SupportedVersions=["3"]),
+    )
+
+    assert _ids(index.search('"search the web"')) == ["a"]
+    assert _ids(index.search("web search", versions=["3"])) == ["b"]
+
+
+def test_suggest__returns_most_starred_name_matches():
+    index = _index(
+        make_extension("a", Name="Calculator", GithubStars=5, SupportedVersions=["2"]),
+        make_extension("b", Name="Simple Calc", GithubStars=50, SupportedVersions=["3"]),
+        make_extension("c", Name="Converter", Description="Calculates units", GithubStars=100),
+        make_extension("d", Name="Calendar", GithubStars=5),
+    )
+
+    assert index.suggest("cal") == [
+        {"ID": "b", "Name": "Simple Calc"},
+        {"ID": "a", "Name": "Calculator"},
+        {"ID": "d", "Name": "Calendar"},
+    ]
+    assert index.suggest("cal", limit=1) == [{"ID": "b", "Name": "Simple Calc"}]
+    assert index.suggest("simple ca") == [{"ID": "b", "Name": "Simple Calc"}]
+    assert index.suggest("calc", versions=["2"]) == [{"ID": "a", "Name": "Calculator"}]
+    assert index.suggest("simple x") == []
+    assert index.suggest("-") == []
+
+
+def test_upsert_and_remove():
+    index = _index(make_extension("a", Name="Calculator"))
+    index.upsert(make_extension("b", Name="Calendar"))
+    index.upsert(make_extension("a", Name="Clipboard", Published=True))
+
+    assert _ids(index.search("cal")) == ["b"]
+    assert _ids(index.search("clip")) == ["a"]
+
+    index.upsert(make_extension("b", Name="Calendar", Published=False))
+    index.remove("a")
+
+    assert index.search("cal") == []
+    assert index.stats()["documents"] == 0
+    assert index.stats()["terms"] == 0
+
+
+def test_upsert__is_ignored_until_index_is_built():
+    index = SearchIndex(max_age=300)
+    index.upsert(make_extension("a", Name="Calculator"))
+
+    assert index.stats()["documents"] == 0
+
+
+def test_rebuild__replays_writes_made_while_loading(mocker: MockerFixture):
+    index = SearchIndex(max_age=300)
+
+    def find(*_: Any) -> list[Extension]:
+        # written after Mongo has returned these extensions
+        index.upsert(make_extension("b", Name="Calendar"))
+        index.remove("c")
+        return [make_extension("a", Name="Calculator"), make_extension("c", Name="Calcium")]
+
+    mocker.patch("ext_api.repositories.search_index.extension_collection.find", side_effect=find)
+    index._rebuild_in_background()  # type: ignore
+
+    assert sorted(_ids(index.search("cal"))) == ["a", "b"]
+
+
+def test_apply_projection():
+    ext = make_extension("a", Name="Calculator", Images=["1.png", "2.png"])
+
+    assert apply_projection(ext, {"_id": 0, "ID": 1, "Images": {"$slice": 1}}) == {"ID": "a", "Images": ["1.png"]}
+    assert apply_projection(ext, None) == ext
@@ -1,12 +1,32 @@
+import datetime
+import json
+from typing import Any
+from unittest.mock import MagicMock
+from urllib.error import HTTPError
+
 import pytest
+from pytest_mock import MockerFixture
+from urllib3 import HTTPResponse
 
+from ext_api.entities import RepoInfo
 from ext_api.github import (
+    GraphQLError,
     InvalidGithubUrlError,
+    JsonFileNotFoundError,
+    ProjectNotFoundError,
     VersionsValidationError,
+    _get_json,  # type: ignore
     _read_versions_file,  # type: ignore
     extract_major,
+    get_manifest_and_versions,
     get_project_path,
+    get_releases,
+    get_repo_info,
+    get_repo_info_cached,
+    get_repos_info,
+    github_retry,
 )
+from ext_api.helpers.cache import LRUCache
 
 
 def test_get_project_path__returns_path():
@@ -58,3 +78,173 @@ def test_extract_major():
     assert extract_major("v2.3.0") == "2"
     assert extract_major("123") == "123"
     assert extract_major("abc") is None
+
+
+# requests
+@pytest.fixture(autouse=True)
+def cached_response(mocker: MockerFixture) -> MagicMock:
+    mocker.patch("ext_api.github.save_cached_response")
+    mocker.patch("ext_api.github.delete_cached_response")
+    return mocker.patch("ext_api.github.get_cached_response", return_value=None)
+
+
+def test_get_repo_info__returns_json(mocker: MockerFixture):
+    request = mocker.patch(
+        "ext_api.github.http.request", return_value=HTTPResponse(body=b'{"default_branch": "main"}', status=200)
+    )
+
+    assert get_repo_info("owner/repo") == {"default_branch": "main"}
+    assert request.call_args.args == ("GET", "https://api.github.com/repos/owner/repo")
+
+
+def test_get_repo_info__not_found__raises(mocker: MockerFixture):
+    mocker.patch("ext_api.github.http.request", return_value=HTTPResponse(body=b"{}", status=404))
+    with pytest.raises(ProjectNotFoundError):
+        get_repo_info("owner/repo")
+
+
+def test_get_repo_info__server_error__raises_httperror(mocker: MockerFixture):
+    mocker.patch("ext_api.github.http.request", return_value=HTTPResponse(body=b"{}", status=502))
+    with pytest.raises(HTTPError) as e:
+        get_repo_info("owner/repo")
+    assert e.value.status == 502
+
+
+def test_get_json__not_found__raises(mocker: MockerFixture):
+    mocker.patch("ext_api.github.http.request", return_value=HTTPResponse(body=b"{}", status=404))
+    with pytest.raises(JsonFileNotFoundError):
+        _get_json("owner/repo", "main", "manifest")
+
+
+def test_get_manifest_and_versions__versions_not_found(mocker: MockerFixture):
+    manifest = {"api_version": "3", "name": "Demo", "description": "Demo extension", "authors": "Dev"}
+
+    def request(_method: str, url: str, **_kwargs: Any) -> HTTPResponse:
+        if url.endswith("/manifest.json"):
+            return HTTPResponse(body=json.dumps(manifest).encode(), status=200)
+        return HTTPResponse(body=b"{}", status=404)
+
+    mocker.patch("ext_api.github.http.request", side_effect=request)
+
+    manifest_result, versions_result = get_manifest_and_versions(
+        "owner/repo", RepoInfo(stargazers_count=1, default_branch="main")
+    )
+
+    assert manifest_result.result() == manifest
+    with pytest.raises(JsonFileNotFoundError):
+        versions_result.result()
+
+
+def test_get_releases__walks_all_pages(mocker: MockerFixture):
+    pages = [[{"tag_name": str(i)} for i in range(100)], [{"tag_name": "100"}]]
+    request = mocker.patch(
+        "ext_api.github.http.request",
+        side_effect=[HTTPResponse(body=json.dumps(page).encode(), status=200) for page in pages],
+    )
+
+    releases = get_releases("ulauncher/ulauncher")
+
+    assert len(releases) == 101
+    assert request.call_args.args[1] == "https://api.github.com/repos/ulauncher/ulauncher/releases?per_page=100&page=2"
+
+
+def test_github_retry__retries_server_errors_and_secondary_rate_limits():
+    assert github_retry.is_retry("GET", 503)
+    assert github_retry.is_retry("GET", 403, has_retry_after=True)
+    assert github_retry.is_retry("GET", 429, has_retry_after=True)
+    assert not github_retry.is_retry("GET", 403)
+    assert not github_retry.is_retry("GET", 404)
+
+
+def test_get_repo_info__stores_response_with_etag(mocker: MockerFixture):
+    mocker.patch(
+        "ext_api.github.http.request",
+        return_value=HTTPResponse(body=b'{"default_branch": "main"}', status=200, headers={"ETag": '"abc"'}),
+    )
+    save = mocker.patch("ext_api.github.save_cached_response")
+
+    get_repo_info("owner/repo")
+
+    save.assert_called_once_with(
+        "https://api.github.com/repos/owner/repo", b'{"default_branch": "main"}', '"abc"', None
+    )
+
+
+def test_get_repo_info__not_modified__returns_stored_body(mocker: MockerFixture, cached_response: MagicMock):
+    cached_response.return_value = {
+        "Url": "https://api.github.com/repos/owner/repo",
+        "Body": b'{"default_branch": "main"}',
+        "ETag": '"abc"',
+        "UpdatedAt": datetime.datetime.now(datetime.UTC),
+    }
+    request = mocker.patch("ext_api.github.http.request", return_value=HTTPResponse(body=b"", status=304))
+
+    assert get_repo_info("owner/repo") == {"default_branch": "main"}
+    assert request.call_args.kwargs["headers"]["If-None-Match"] == '"abc"'
+
+
+@pytest.fixture
+def validation_cache(mocker: MockerFixture) -> LRUCache[tuple[str, str], Any]:
+    return mocker.patch("ext_api.github.validation_cache", LRUCache(maxsize=10, ttl=60))
+
+
+@pytest.mark.usefixtures("validation_cache")
+def test_get_repo_info_cached__reuses_results_and_not_found_errors(mocker: MockerFixture):
+    request = mocker.patch(
+        "ext_api.github.http.request",
+        side_effect=[
+            HTTPResponse(body=b'{"default_branch": "main"}', status=200),
+            HTTPResponse(body=b"{}", status=404),
+        ],
+    )
+
+    assert get_repo_info_cached("owner/repo") == {"default_branch": "main"}
+    assert get_repo_info_cached("Owner/Repo") == {"default_branch": "main"}
+    for _ in range(2):
+        with pytest.raises(ProjectNotFoundError):
+            get_repo_info_cached("owner/gone")
+    assert request.call_count == 2
+
+
+@pytest.mark.usefixtures("validation_cache")
+def test_get_repo_info_cached__doesnt_cache_server_errors(mocker: MockerFixture):
+    request = mocker.patch(
+        "ext_api.github.http.request",
+        side_effect=[
+            HTTPResponse(body=b"{}", status=502),
+            HTTPResponse(body=b'{"default_branch": "main"}', status=200),
+        ],
+    )
+
+    with pytest.raises(HTTPError):
+        get_repo_info_cached("owner/repo")
+    assert get_repo_info_cached("owner/repo") == {"default_branch": "main"}
+    assert request.call_count == 2
+
+
+def test_get_repos_info__returns_found_repos(mocker: MockerFixture):
+    payload = {
+        "data": {
+            "r0": {"stargazerCount": 7, "defaultBranchRef": {"name": "main", "target": {"oid": "abc"}}},
+            "r1": None,
+        },
+        "errors": [{"type": "NOT_FOUND", "path": ["r1"]}],
+    }
+    request = mocker.patch(
+        "ext_api.github.http.request", return_value=HTTPResponse(body=json.dumps(payload).encode(), status=200)
+    )
+
+    assert get_repos_info(["owner/repo", "owner/missing"]) == {
+        "owner/repo": {"stargazers_count": 7, "default_branch": "main", "head_sha": "abc"}
+    }
+    body = json.loads(request.call_args.kwargs["body"])
+    assert body["variables"] == {"owner0": "owner", "name0": "repo", "owner1": "owner", "name1": "missing"}
+
+
+def test_get_repos_info__other_errors__raise(mocker: MockerFixture):
+    payload = {"data": None, "errors": [{"type": "RATE_LIMITED"}]}
+    mocker.patch(
+        "ext_api.github.http.request", return_value=HTTPResponse(body=json.dumps(payload).encode(), status=200)
+    )
+    with pytest.raises(GraphQLError):
+        get_repos_info(["owner/repo"])
@@ -0,0 +1,69 @@
+import hashlib
+import hmac
+import json
+import time
+from typing import Any
+
+import pytest
+from pytest_mock import MockerFixture
+
+from ext_api.github_webhooks import InvalidSignatureError, handle_event, verify_signature
+from ext_api.helpers.debounce import Debouncer
+
+SECRET = "webhook-secret"
+PUSH_PAYLOAD: dict[str, Any] = {
+    "ref": "refs/heads/main",
+    "after": "0d1a26e67d8f5eaf1f6ba5c57fc3c7d91ac0fd1c",
+    "repository": {"full_name": "Owner/Repo", "default_branch": "main", "stargazers_count": 10},
+}
+STAR_PAYLOAD: dict[str, Any] = {
+    "action": "created",
+    "starred_at": "2024-05-01T12:30:00Z",
+    "repository": {"full_name": "owner/repo", "default_branch": "main", "stargazers_count": 11},
+}
+
+
+def _sign(body: bytes, secret: str = SECRET) -> str:
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def test_verify_signature__valid():
+    body = json.dumps(PUSH_PAYLOAD).encode()
+    verify_signature(body, _sign(body), SECRET)
+
+
+@pytest.mark.parametrize(
+    ("signature", "secret"),
+    [
+        (None, SECRET),
+        ("sha1=abc", SECRET),
+        (_sign(b"{}", "other-secret"), SECRET),
+        (_sign(b"{}", SECRET), ""),
+    ],
+)
+def test_verify_signature__invalid__raises(signature: str | None, secret: str):
+    with pytest.raises(InvalidSignatureError):
+        verify_signature(b"{}", signature, secret)
+
+
+@pytest.fixture
+def resync_extension(mocker: MockerFixture):
+    mocker.patch("ext_api.github_webhooks._debouncer", Debouncer(delay=0.05))
+    return mocker.patch("ext_api.github_webhooks.resync_extension")
+
+
+def test_handle_event__resyncs_once_for_repeated_events(resync_extension: Any):
+    assert handle_event("push", PUSH_PAYLOAD)
+    assert handle_event("star", STAR_PAYLOAD)
+    time.sleep(0.2)
+
+    resync_extension.assert_called_once_with("Owner/Repo")
+
+
+def test_handle_event__ignores_other_branches_and_events(resync_extension: Any):
+    assert not handle_event("push", {**PUSH_PAYLOAD, "ref": "refs/heads/feature"})
+    assert not handle_event("ping", {"zen": "Keep it logically awesome.", "repository": PUSH_PAYLOAD["repository"]})
+    assert not handle_event("star", {"action": "created"})
+    time.sleep(0.1)
+
+    resync_extension.assert_not_called()
@@ -0,0 +1,83 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import pytest
+from pytest_mock import MockerFixture
+
+from ext_api.entities import Extension, RepoInfo
+from ext_api.helpers.token_pool import TokenPool
+from ext_api.sync_daemon import MAX_SLEEP, ScheduleEntry, SyncDaemon, SyncSchedule
+from tests.conftest import make_extension
+
+HOUR = 3600
+
+
+@pytest.fixture
+def schedule() -> SyncSchedule:
+    return SyncSchedule(base_interval=24 * HOUR, min_interval=HOUR, max_interval=7 * 24 * HOUR)
+
+
+def test_sync_schedule__popular_and_changed_extensions_are_synced_more_often(schedule: SyncSchedule):
+    dormant = schedule.get_interval(ScheduleEntry(ext=make_extension("dormant", GithubStars=5), due_at=0, unchanged=0))
+    popular = schedule.get_interval(
+        ScheduleEntry(ext=make_extension("popular", GithubStars=5000), due_at=0, unchanged=0)
+    )
+    backed_off = schedule.get_interval(
+        ScheduleEntry(ext=make_extension("dormant", GithubStars=5), due_at=0, unchanged=2)
+    )
+
+    assert HOUR <= popular < dormant
+    assert backed_off == 4 * dormant
+    assert schedule.get_interval(ScheduleEntry(ext=make_extension("a"), due_at=0, unchanged=100)) == 7 * 24 * HOUR
+
+
+def test_sync_schedule__pops_due_extensions(schedule: SyncSchedule):
+    schedule.load(
+        [make_extension("a", GithubStars=5), make_extension("b", GithubStars=5000), make_extension("c")], now=0
+    )
+    assert [ext["ID"] for ext in schedule.pop_due(now=0, limit=2)] == ["a", "b"]
+    schedule.reschedule("a", changed=False, now=0)
+    schedule.reschedule("b", changed=True, now=0)
+
+    assert [ext["ID"] for ext in schedule.pop_due(now=0, limit=10)] == ["c"]
+    assert schedule.next_due_at() == schedule.get_interval(
+        ScheduleEntry(ext=make_extension("b", GithubStars=5000), due_at=0, unchanged=0)
+    )
+    assert schedule.pop_due(now=2 * HOUR, limit=10) == [make_extension("b", GithubStars=5000)]
+
+
+def test_sync_schedule__load_drops_removed_and_keeps_known_extensions(schedule: SyncSchedule):
+    schedule.load([make_extension("a"), make_extension("b")], now=0)
+    schedule.pop_due(now=0, limit=1)
+    schedule.reschedule("a", changed=False, now=0)
+
+    schedule.load([make_extension("a", GithubStars=10), make_extension("c")], now=HOUR)
+
+    assert len(schedule) == 2
+    assert [ext["ID"] for ext in schedule.pop_due(now=HOUR, limit=10)] == ["c"]
+
+
+def test_sync_daemon__syncs_due_extensions_within_rate_budget(mocker: MockerFixture, schedule: SyncSchedule):
+    extensions = [make_extension("a", GithubStars=1), make_extension("b", GithubStars=2)]
+    mocker.patch("ext_api.sync_daemon.iter_extensions", return_value=iter(extensions))
+    mocker.patch("ext_api.sync_daemon.get_batch_repos_info", return_value={})
+    bulk_update_extensions = mocker.patch("ext_api.sync_extensions.bulk_update_extensions", side_effect=len)
+
+    def sync_extension(ext: Extension, repo_info: RepoInfo | None) -> tuple[str, dict[str, Any]]:
+        assert repo_info is None
+        return "synced", {"GithubStars": 10} if ext["ID"] == "a" else {}
+
+    mocker.patch("ext_api.sync_daemon.sync_extension", side_effect=sync_extension)
+    token_pool = mocker.patch("ext_api.sync_daemon.token_pool", TokenPool(["user:token"], reserve=0))
+    token_pool.limiters["user:token"].limit = 3600
+    daemon = SyncDaemon(schedule, concurrency=2, rate_budget=0.5)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        # nothing else is due soon
+        assert daemon.run_once(executor) == MAX_SLEEP
+        # 2 REST requests with a budget of 1800 requests per hour
+        assert abs(daemon.run_once(executor) - 4) < 0.1
+
+    bulk_update_extensions.assert_called_once_with({"a": {"GithubStars": 10}})
+    assert extensions[0]["GithubStars"] == 10
+    assert schedule.pop_due(now=0, limit=10) == []
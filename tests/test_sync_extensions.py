@@ -0,0 +1,247 @@
+import datetime
+from typing import Any
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_mock import MockerFixture
+
+from ext_api.entities import RepoInfo
+from ext_api.github import JsonFileNotFoundError, ProjectNotFoundError
+from ext_api.repositories.extensions import bulk_update_extensions as bulk_update_extensions_impl
+from ext_api.repositories.search_index import SearchIndex
+from ext_api.sync_extensions import (
+    PendingUpdates,
+    SyncCheckpoints,
+    in_shard,
+    parse_shard,
+    resync_extension,
+    sync_extensions,
+)
+from tests.conftest import make_extension
+
+
+@pytest.fixture(autouse=True)
+def sync_state(mocker: MockerFixture) -> dict[str, MagicMock]:
+    started_at = datetime.datetime.now(datetime.UTC)
+    return {
+        "acquire_lease": mocker.patch("ext_api.sync_extensions.acquire_lease", return_value=True),
+        "release_lease": mocker.patch("ext_api.sync_extensions.release_lease"),
+        "start_sync_run": mocker.patch("ext_api.sync_extensions.start_sync_run", return_value=(started_at, False)),
+        "finish_sync_run": mocker.patch("ext_api.sync_extensions.finish_sync_run"),
+        "is_sync_run_finished": mocker.patch("ext_api.sync_extensions.is_sync_run_finished", return_value=False),
+        "get_checkpointed_ids": mocker.patch("ext_api.sync_extensions.get_checkpointed_ids", return_value=set()),
+        "save_checkpoints": mocker.patch("ext_api.sync_extensions.save_checkpoints"),
+    }
+
+
+def _written(bulk_update_extensions: MagicMock) -> dict[str, dict[str, Any]]:
+    return {id: data for c in bulk_update_extensions.call_args_list for id, data in c.args[0].items()}
+
+
+@pytest.fixture
+def bulk_update_extensions(mocker: MockerFixture) -> MagicMock:
+    extensions = [
+        make_extension("github-owner-ok", ProjectPath="owner/ok", GithubStars=1),
+        make_extension("github-owner-gone", ProjectPath="owner/gone", GithubStars=1),
+        make_extension("github-owner-broken", ProjectPath="owner/broken", GithubStars=1, GithubHeadSha="abc"),
+    ]
+    mocker.patch("ext_api.sync_extensions.iter_extensions", side_effect=lambda **_: iter(extensions))  # type: ignore
+    mocker.patch("ext_api.github.get_versions", return_value={"versions": [{"api_version": "3"}]})
+    mocker.patch("ext_api.github.get_manifest", return_value={"api_version": "4"})
+
+    def get_repo_info(project_path: str) -> RepoInfo:
+        if project_path == "owner/gone":
+            raise ProjectNotFoundError(project_path)
+        if project_path == "owner/broken":
+            raise ValueError(project_path)
+        return RepoInfo(stargazers_count=5, default_branch="main")
+
+    mocker.patch("ext_api.sync_extensions.get_repo_info", side_effect=get_repo_info)
+    # every update modifies one document
+    return mocker.patch("ext_api.sync_extensions.bulk_update_extensions", side_effect=len)
+
+
+@pytest.mark.parametrize("concurrency", [1, 3])
+def test_sync_extensions__isolates_failures(bulk_update_extensions: MagicMock, concurrency: int):
+    result = sync_extensions(concurrency=concurrency)
+
+    assert result == {"synced": 1, "unchanged": 0, "unpublished": 1, "failed": 1, "modified": 2}
+    assert _written(bulk_update_extensions) == {
+        "github-owner-gone": {"Published": False},
+        "github-owner-ok": {"GithubStars": 5, "SupportedVersions": ["3"]},
+    }
+
+
+def test_sync_extensions__uses_graphql_repo_info(mocker: MockerFixture, bulk_update_extensions: MagicMock):
+    mocker.patch("ext_api.sync_extensions.github_api_credentials", ["user:token"])
+    get_repos_info = mocker.patch(
+        "ext_api.sync_extensions.get_repos_info",
+        return_value={"owner/broken": RepoInfo(stargazers_count=1, default_branch="main", head_sha="def")},
+    )
+
+    result = sync_extensions(concurrency=2)
+
+    get_repos_info.assert_called_once_with(["owner/ok", "owner/gone", "owner/broken"])
+    # repos missing from GraphQL response are fetched with REST API
+    assert result == {"synced": 2, "unchanged": 0, "unpublished": 1, "failed": 0, "modified": 3}
+    # stars haven't changed
+    assert _written(bulk_update_extensions)["github-owner-broken"] == {
+        "SupportedVersions": ["3"],
+        "GithubHeadSha": "def",
+    }
+
+
+@pytest.mark.parametrize("full", [False, True])
+def test_sync_extensions__skips_versions_of_repos_without_new_commits(
+    mocker: MockerFixture, bulk_update_extensions: MagicMock, full: bool
+):
+    mocker.patch("ext_api.sync_extensions.github_api_credentials", ["user:token"])
+    mocker.patch(
+        "ext_api.sync_extensions.get_repos_info",
+        return_value={
+            "owner/ok": RepoInfo(stargazers_count=5, default_branch="main", head_sha="new"),
+            "owner/broken": RepoInfo(stargazers_count=1, default_branch="main", head_sha="abc"),
+        },
+    )
+
+    result = sync_extensions(full=full)
+
+    assert result == {
+        "synced": 2 if full else 1,
+        "unchanged": 0 if full else 1,
+        "unpublished": 1,
+        "failed": 0,
+        "modified": 3 if full else 2,
+    }
+    written = _written(bulk_update_extensions)
+    assert written["github-owner-ok"] == {"GithubStars": 5, "SupportedVersions": ["3"], "GithubHeadSha": "new"}
+    assert ("github-owner-broken" in written) == full
+
+
+def test_sync_extensions__falls_back_to_manifest_without_versions_file(
+    mocker: MockerFixture, bulk_update_extensions: MagicMock
+):
+    mocker.patch("ext_api.github.get_versions", side_effect=JsonFileNotFoundError)
+
+    sync_extensions()
+
+    assert _written(bulk_update_extensions)["github-owner-ok"] == {"GithubStars": 5, "SupportedVersions": ["4"]}
+
+
+def test_pending_updates__writes_in_batches(mocker: MockerFixture):
+    bulk_update_extensions = mocker.patch("ext_api.sync_extensions.bulk_update_extensions", return_value=1)
+    pending_updates = PendingUpdates(batch_size=2)
+
+    pending_updates.add("a", {"GithubStars": 1})
+    pending_updates.add("b", {})
+    assert bulk_update_extensions.call_count == 0
+    pending_updates.add("c", {"GithubStars": 2})
+    assert bulk_update_extensions.call_count == 1
+    pending_updates.add("d", {"GithubStars": 3})
+    pending_updates.flush()
+    pending_updates.flush()
+
+    assert [c.args[0] for c in bulk_update_extensions.call_args_list] == [
+        {"a": {"GithubStars": 1}, "c": {"GithubStars": 2}},
+        {"d": {"GithubStars": 3}},
+    ]
+    assert pending_updates.modified == 2
+
+
+def test_sync_extensions__syncs_only_extensions_of_shard(bulk_update_extensions: MagicMock):
+    written: list[str] = []
+    for index in range(2):
+        bulk_update_extensions.reset_mock()
+        sync_extensions(shard=(index, 2))
+        shard_written = list(_written(bulk_update_extensions))
+        assert all(in_shard(id, (index, 2)) for id in shard_written)
+        written += shard_written
+
+    assert sorted(written) == ["github-owner-gone", "github-owner-ok"]
+
+
+def test_sync_extensions__resumes_interrupted_run(bulk_update_extensions: MagicMock, sync_state: dict[str, MagicMock]):
+    sync_state["start_sync_run"].return_value = (datetime.datetime.now(datetime.UTC), True)
+    sync_state["get_checkpointed_ids"].return_value = {"github-owner-ok"}
+
+    result = sync_extensions()
+
+    assert result
+    assert result["synced"] == 0
+    assert _written(bulk_update_extensions) == {"github-owner-gone": {"Published": False}}
+    assert sync_state["save_checkpoints"].call_args.args == (["github-owner-gone"],)
+    sync_state["finish_sync_run"].assert_called_once_with("shard:0/1")
+    sync_state["release_lease"].assert_called_once()
+
+
+def test_sync_extensions__skips_shard_synced_by_another_run(
+    mocker: MockerFixture, bulk_update_extensions: MagicMock, sync_state: dict[str, MagicMock]
+):
+    sleep = mocker.patch("ext_api.sync_extensions.time.sleep")
+    sync_state["acquire_lease"].side_effect = [False, False, True]
+    sync_state["is_sync_run_finished"].return_value = True
+
+    result = sync_extensions()
+
+    assert result == {"synced": 0, "unchanged": 0, "unpublished": 0, "failed": 0, "modified": 0}
+    assert sleep.call_count == 2
+    bulk_update_extensions.assert_not_called()
+    sync_state["start_sync_run"].assert_not_called()
+
+
+def test_sync_checkpoints__are_saved_after_changes_are_written(mocker: MockerFixture, sync_state: dict[str, MagicMock]):
+    bulk_update_extensions = mocker.patch("ext_api.sync_extensions.bulk_update_extensions", side_effect=len)
+    pending_updates = PendingUpdates(batch_size=10)
+    checkpoints = SyncCheckpoints(pending_updates, batch_size=2)
+
+    pending_updates.add("a", {"GithubStars": 1})
+    checkpoints.add("a")
+    assert sync_state["save_checkpoints"].call_count == 0
+    checkpoints.add("b")
+
+    bulk_update_extensions.assert_called_once_with({"a": {"GithubStars": 1}})
+    sync_state["save_checkpoints"].assert_called_once_with(["a", "b"])
+
+
+def test_resync_extension__writes_changes(mocker: MockerFixture, bulk_update_extensions: MagicMock):
+    find = mocker.patch(
+        "ext_api.sync_extensions.find_extension_by_project_path",
+        return_value=make_extension("github-owner-ok", ProjectPath="owner/ok", GithubStars=1),
+    )
+
+    assert resync_extension("Owner/OK")
+
+    find.assert_called_once_with("Owner/OK")
+    bulk_update_extensions.assert_called_once_with({"github-owner-ok": {"GithubStars": 5, "SupportedVersions": ["3"]}})
+
+
+@pytest.mark.usefixtures("bulk_update_extensions")
+def test_resync_extension__updates_search_index(mocker: MockerFixture):
+    ext = make_extension("github-owner-ok", ProjectPath="owner/ok", GithubStars=1)
+    mocker.patch("ext_api.sync_extensions.find_extension_by_project_path", return_value=ext)
+    mocker.patch("ext_api.sync_extensions.bulk_update_extensions", wraps=bulk_update_extensions_impl)
+    index = SearchIndex(max_age=300)
+    index.rebuild([ext])
+    mocker.patch("ext_api.repositories.extensions.search_index", index)
+    collection = mocker.patch("ext_api.repositories.extensions.extension_collection")
+    collection.bulk_write.return_value.modified_count = 1
+    collection.find.return_value = [{**ext, "GithubStars": 5, "SupportedVersions": ["3"]}]
+
+    assert resync_extension("owner/ok")
+
+    # search results and suggestions don't wait for the next rebuild of the index
+    assert [found["GithubStars"] for found in index.search("owner/ok", [], "GithubStars", -1)] == [5]
+
+
+def test_resync_extension__unknown_project(mocker: MockerFixture, bulk_update_extensions: MagicMock):
+    mocker.patch("ext_api.sync_extensions.find_extension_by_project_path", return_value=None)
+
+    assert not resync_extension("owner/unknown")
+    bulk_update_extensions.assert_not_called()
+
+
+def test_parse_shard():
+    assert parse_shard("1/4") == (1, 4)
+    for value in ["4/4", "-1/2", "1", "a/b"]:
+        with pytest.raises(ValueError):  # noqa: PT011
+            parse_shard(value)
@@ -0,0 +1,53 @@
+from urllib.error import URLError
+
+import pytest
+from pytest_mock import MockerFixture
+
+from ext_api.ulauncher_releases import ReleaseIndex
+
+RELEASES = [{"tag_name": "6.0.0", "name": "Ulauncher 6"}, {"tag_name": "5.15.7", "name": "Ulauncher 5"}]
+
+
+@pytest.fixture
+def index() -> ReleaseIndex:
+    return ReleaseIndex("ulauncher/ulauncher", max_age=600, miss_refresh_interval=60)
+
+
+def test_release_index__answers_from_memory(mocker: MockerFixture, index: ReleaseIndex):
+    get_releases = mocker.patch("ext_api.ulauncher_releases.get_releases", return_value=RELEASES)
+
+    assert index.get("6.0.0") == RELEASES[0]
+    assert index.get("5.15.7") == RELEASES[1]
+    # unknown tags don't refresh the index more often than once per miss_refresh_interval
+    assert index.get("7.0.0") is None
+    assert index.get("7.0.0") is None
+
+    get_releases.assert_called_once_with("ulauncher/ulauncher")
+
+
+def test_release_index__unknown_tag_refreshes_index(mocker: MockerFixture, index: ReleaseIndex):
+    get_releases = mocker.patch("ext_api.ulauncher_releases.get_releases", return_value=RELEASES)
+    time = mocker.patch("ext_api.ulauncher_releases.time.time", return_value=1000.0)
+    index.get("6.0.0")
+
+    time.return_value = 1100.0
+    get_releases.return_value = [{"tag_name": "6.0.1"}, *RELEASES]
+    assert index.get("6.0.1") == {"tag_name": "6.0.1"}
+    assert get_releases.call_count == 2
+
+
+def test_release_index__serves_stale_releases_if_refresh_fails(mocker: MockerFixture, index: ReleaseIndex):
+    get_releases = mocker.patch("ext_api.ulauncher_releases.get_releases", return_value=RELEASES)
+    time = mocker.patch("ext_api.ulauncher_releases.time.time", return_value=1000.0)
+    index.get("6.0.0")
+
+    time.return_value = 1100.0
+    get_releases.side_effect = URLError("unreachable")
+    assert index.get("7.0.0") is None
+    assert index.get("6.0.0") == RELEASES[0]
+
+
+def test_release_index__raises_if_it_cant_be_built(mocker: MockerFixture, index: ReleaseIndex):
+    mocker.patch("ext_api.ulauncher_releases.get_releases", side_effect=URLError("unreachable"))
+    with pytest.raises(URLError):
+        index.get("6.0.0")